@@ -1,6 +1,5 @@
-from .rag_agent import openai_rag_agent
+from .rag_agent import get_rag_agent
 
 __all__ = [
-    "openai_rag_agent"
+    "get_rag_agent"
 ]
-
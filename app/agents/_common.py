@@ -0,0 +1,199 @@
+"""
+Shared RAG agent setup
+Environment, memory, knowledge and the agent builder, created once per process
+"""
+import os
+from dotenv import load_dotenv
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from agno.agent.agent import Agent
+    from agno.memory import MemoryManager
+    from agno.session import SessionSummaryManager
+    from app.cache import SemanticCache
+    from app.knowledge import KnowledgeRouter
+
+load_dotenv()
+
+# Get environment variables
+POSTGRES_DB_URL = os.getenv("POSTGRES_DB_URL")
+LLM_MODEL_API_KEY = os.getenv("LLM_MODEL_API_KEY")
+LLM_MODEL_BASE_URL = os.getenv("LLM_MODEL_BASE_URL")
+RAG_AGENT_MODEL = os.getenv("RAG_AGENT_MODEL")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
+AGNO_DEBUG = os.getenv("AGNO_DEBUG") == "1"
+RAG_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("RAG_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+os.environ["OPENAI_API_KEY"] = LLM_MODEL_API_KEY
+
+# Check if all required environment variables are set
+if not POSTGRES_DB_URL:
+    raise ValueError("POSTGRES_DB_URL environment variable is required")
+
+if not LLM_MODEL_API_KEY:
+    raise ValueError("LLM_MODEL_API_KEY environment variable is required")
+
+if not LLM_MODEL_BASE_URL:
+    raise ValueError("LLM_MODEL_BASE_URL environment variable is required")
+
+if not RAG_AGENT_MODEL:
+    raise ValueError("RAG_AGENT_MODEL environment variable is required")
+
+
+# agno and the OpenAI SDK are imported inside the factories below so importing this module stays cheap;
+# the cost is paid once when the app's startup hook first builds the agent.
+
+@lru_cache(maxsize=1)
+def get_memory_manager() -> "MemoryManager":
+    """Memory Manager - automatically extracts and stores memories from conversations"""
+    from agno.memory import MemoryManager
+    from agno.models.openai import OpenAIChat
+
+    from app.clients import openai_client, async_openai_client, get_db
+
+    return MemoryManager(
+        db=get_db(),
+        model=OpenAIChat(
+            id="gpt-4o-mini", # small model for memory management
+            base_url=LLM_MODEL_BASE_URL,
+            client=openai_client,
+            async_client=async_openai_client,
+        ),
+        memory_capture_instructions="Extract and store key information about the user including their name, preferences, personal details etc.",
+    )
+
+
+@lru_cache(maxsize=1)
+def get_session_summary_manager() -> "SessionSummaryManager":
+    """Setup your Session Summary Manager, to adjust how summaries are created"""
+    from agno.models.openai import OpenAIChat
+    from agno.session import SessionSummaryManager
+
+    from app.clients import openai_client, async_openai_client
+
+    return SessionSummaryManager(
+        model=OpenAIChat(
+            id="gpt-4o-mini", # small model for session summary management
+            base_url=LLM_MODEL_BASE_URL,
+            client=openai_client,
+            async_client=async_openai_client,
+        ),
+        # You can also overwrite the prompt used for session summary creation
+        session_summary_prompt="Create a very succinct summary of the following conversation:",
+    )
+
+
+@lru_cache(maxsize=1)
+def get_semantic_cache() -> "SemanticCache":
+    """Paraphrased questions are answered from here instead of re-running the rag agent"""
+    from app.cache import SemanticCache
+    from app.clients import get_db
+
+    return SemanticCache(
+        db_engine=get_db().db_engine,
+        table_name="rag_query_cache",
+        threshold=RAG_SEMANTIC_CACHE_THRESHOLD,
+        ttl=7200,  # Matches the agent model's cache_ttl
+    )
+
+
+@lru_cache(maxsize=1)
+def get_knowledge_router() -> "KnowledgeRouter":
+    """Vector-only and hybrid knowledge over the same table; only lexical-looking queries take the hybrid path"""
+    from agno.vectordb.pgvector import SearchType
+    from agno.vectordb.pgvector.index import HNSW
+
+    from app.clients import VECTOR_HALF_PRECISION, get_db, get_embedder
+    from app.knowledge import CachedKnowledge, KnowledgeRouter, RRFPgVector
+
+    db = get_db()
+
+    embedder = get_embedder()
+
+    knowledge_vector = CachedKnowledge(
+        vector_db=RRFPgVector(
+                table_name="organization_policies_processes_vectors",
+                db_engine=db.db_engine,
+                search_type=SearchType.vector,
+                vector_index=HNSW(m=16, ef_construction=64),  # ef_search is sized per query
+                embedder=embedder,
+                half_precision=VECTOR_HALF_PRECISION,
+            ),
+        max_results=3,
+    )
+
+    knowledge = CachedKnowledge(
+        vector_db=RRFPgVector(
+                table_name="organization_policies_processes_vectors",
+                db_engine=db.db_engine,
+                search_type=SearchType.hybrid, # SearchType.hybrid combines vector (semantic) and keyword (lexical) search, fused with RRF 
+                vector_index=HNSW(m=16, ef_construction=64),
+                embedder=embedder,
+                half_precision=VECTOR_HALF_PRECISION,
+            ),
+        max_results=3,  # Get more context for comprehensive responses
+    )
+
+    return KnowledgeRouter(knowledge_vector, knowledge, max_results=3)
+
+
+def build_rag_agent(*, instructions: str, name: str = "OpenAI RAG Agent") -> "Agent":
+    """Build a RAG agent over the shared db, memory manager and knowledge router with the given instructions"""
+    from agno.agent.agent import Agent
+    from agno.models.openai import OpenAIChat
+    from agno.tools.calculator import CalculatorTools
+    from agno.tools.memory import MemoryTools
+    from agno.tools.reasoning import ReasoningTools
+
+    from app.clients import AGNO_CACHE_DIR, openai_client, async_openai_client, get_db
+    from app.tools.policy_tools import PolicyTools
+
+    db = get_db()
+    knowledge_router = get_knowledge_router()
+
+    return Agent(
+        name=name,
+        model=OpenAIChat(
+            id="gpt-4o-mini",
+            api_key=LLM_MODEL_API_KEY,
+            base_url=LLM_MODEL_BASE_URL,
+            client=openai_client,
+            async_client=async_openai_client,
+            cache_response=True,  # Enable response caching
+            cache_ttl=7200,  # Optional: cache expires after 1 hour
+            cache_dir=AGNO_CACHE_DIR  # tmpfs by default, see app.clients
+        ),
+        tools=[
+            MemoryTools(db=db), 
+            ReasoningTools(add_instructions=True, add_few_shot=True, enable_think=True, enable_analyze=True),
+            CalculatorTools(), 
+            PolicyTools()
+        ],
+        description="Enterprise policy analysis agent with access to company policy documents.",
+        instructions=instructions,
+        db=db,
+        # user_id and session_id are None here - will be provided dynamically by AgentOS per request
+        memory_manager=get_memory_manager(),
+        enable_user_memories=True,  # Automatically extracts memories from conversations
+        add_history_to_context=True,
+        num_history_runs=10,
+        knowledge=knowledge_router.hybrid_knowledge,
+        knowledge_retriever=knowledge_router.aretrieve,  # Agents built here are only run with arun
+        update_knowledge=True,
+        add_knowledge_to_context=True,
+        search_knowledge=True,
+        markdown=True,
+        debug_mode=AGNO_DEBUG,
+        # session_summary_manager=get_session_summary_manager(),
+        # enable_session_summaries=True,
+        # reasoning=True,
+        # reasoning_model=OpenAIChat(
+        #     id="gpt-5",
+        #     api_key=LLM_MODEL_API_KEY,
+        #     base_url=LLM_MODEL_BASE_URL,
+        # ),
+        # reasoning_agent=,
+        # reasoning_min_steps=1,
+        # reasoning_max_steps=10,
+    )
@@ -4,12 +4,14 @@ Analyzes retrieved content and uses tools to generate answers
 """
 import os
 from dotenv import load_dotenv
+from functools import lru_cache
 from textwrap import dedent
 
 from agno.agent.agent import Agent
 from agno.models.openai import OpenAIChat
 from agno.tools.calculator import CalculatorTools
 
+from app.clients import openai_client, async_openai_client
 from app.tools.policy_tools import PolicyTools
 
 load_dotenv()
@@ -20,21 +22,10 @@ LLM_MODEL_BASE_URL = os.getenv("LLM_MODEL_BASE_URL")
 
 os.environ["OPENAI_API_KEY"] = LLM_MODEL_API_KEY
 
-policy_tools = PolicyTools()
-calculator_tools = CalculatorTools()
-
-analysis_agent = Agent(
-    name="Analysis Agent",
-    model=OpenAIChat(
-        id="gpt-4o-mini",
-        api_key=LLM_MODEL_API_KEY,
-        base_url=LLM_MODEL_BASE_URL,
-    ),
-    tools=[policy_tools, calculator_tools],
-    description="Analyzes policy content and generates well-formatted markdown responses.",
-    instructions=dedent("""
+
+_ANALYSIS_INSTRUCTIONS = dedent("""
     You are an Analysis Agent. Generate a clean, well-formatted markdown response.
-    
+
     FORMATTING RULES (CRITICAL):
     1. Always include spaces between words
     2. Always include blank lines between sections
@@ -42,33 +33,49 @@ analysis_agent = Agent(
     4. NO duplicate content
     5. NO JSON structures
     6. Return response ONCE only
-    
+
     MARKDOWN STRUCTURE:
-    
+
     ## Main Title
-    
+
     Introduction paragraph with proper spacing.
-    
+
     ### Section Title
-    
+
     - Bullet point with proper spacing
     - Another bullet point
-    
+
     ### Table Example
-    
+
     | Column 1 | Column 2 |
     |----------|----------|
     | Value 1  | Value 2  |
-    
+
     **Important:** Always use proper punctuation and spacing.
-    
+
     Available Tools:
     - step_counter: Count keywords
     - calculator: Perform calculations
     - role_lookup: Get role permissions
-    
+
     Return ONLY clean markdown. NO JSON. NO duplicates.
-    """),
-    markdown=True,
-)
+    """)
+
 
+@lru_cache(maxsize=1)
+def get_analysis_agent() -> Agent:
+    """Build the Analysis Agent once per process"""
+    return Agent(
+        name="Analysis Agent",
+        model=OpenAIChat(
+            id="gpt-4o-mini",
+            api_key=LLM_MODEL_API_KEY,
+            base_url=LLM_MODEL_BASE_URL,
+            client=openai_client,
+            async_client=async_openai_client,
+        ),
+        tools=[PolicyTools(), CalculatorTools()],
+        description="Analyzes policy content and generates well-formatted markdown responses.",
+        instructions=_ANALYSIS_INSTRUCTIONS,
+        markdown=True,
+    )
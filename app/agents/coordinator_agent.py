@@ -3,59 +3,103 @@ Coordinator Agent
 Orchestrates the multi-agent workflow: receives query, routes to worker agents, aggregates results
 """
 import os
-import json
+import re
+import asyncio
+import orjson
 from dotenv import load_dotenv
 from textwrap import dedent
-from typing import Dict, Any
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Any, List
 
 from agno.team import Team
 from agno.agent.agent import Agent
 from agno.models.openai import OpenAIChat
-from agno.db.postgres import PostgresDb
+from agno.run.agent import RunEvent
+from agno.run.team import TeamRunEvent
 from agno.memory import MemoryManager
 from agno.tools.memory import MemoryTools
+from agno.utils.log import logger
 
+from app.cache import SemanticCache
+from app.clients import AGNO_CACHE_DIR, openai_client, async_openai_client, get_db, get_embedder, probe_rate_limits
 from app.tools.policy_tools import PolicyTools
-from app.agents.information_retrieval_agent import information_retrieval_agent
-from app.agents.analysis_agent import analysis_agent
+from app.utils import TokenBucketRateLimiter, batch_chunks
+from app.agents.information_retrieval_agent import get_information_retrieval_agent
+from app.agents.analysis_agent import get_analysis_agent
 
 load_dotenv()
 
 # Get environment variables
-POSTGRES_DB_URL = os.getenv("POSTGRES_DB_URL")
 LLM_MODEL_API_KEY = os.getenv("LLM_MODEL_API_KEY")
 LLM_MODEL_BASE_URL = os.getenv("LLM_MODEL_BASE_URL")
+# Same default as the rag path: looser thresholds serve answers across questions that differ only in an amount
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+AGNO_DEBUG = os.getenv("AGNO_DEBUG") == "1"
+TEAM_MAX_CONCURRENCY = int(os.getenv("TEAM_MAX_CONCURRENCY", "50"))
+TEAM_DISPATCH = os.getenv("TEAM_DISPATCH", "team")  # "team" or "staircase"
+TEAM_TOKENS_PER_RUN = int(os.getenv("TEAM_TOKENS_PER_RUN", "4000"))
+LLM_MAX_REQUESTS_PER_MINUTE = os.getenv("LLM_MAX_REQUESTS_PER_MINUTE")
+LLM_MAX_TOKENS_PER_MINUTE = os.getenv("LLM_MAX_TOKENS_PER_MINUTE")
+LLM_RATE_LIMIT_PROBE = os.getenv("LLM_RATE_LIMIT_PROBE") == "1"
 
 os.environ["OPENAI_API_KEY"] = LLM_MODEL_API_KEY
 
-db = PostgresDb(db_url=POSTGRES_DB_URL)
 
-memory_tools = MemoryTools(db=db)
+# Backpressure: excess team runs wait here instead of flooding the LLM backend into 429s
+_TEAM_SEM = asyncio.Semaphore(TEAM_MAX_CONCURRENCY)
 
-memory_manager = MemoryManager(
-    db=db,
-    model=OpenAIChat(
-        id="gpt-4o-mini",
-        base_url=LLM_MODEL_BASE_URL,
-    ),
-    memory_capture_instructions="Extract and store key information about the user including their name, preferences, personal details etc.",
-)
+# Coordinator + IRA + AA + final aggregation
+_TEAM_REQUESTS_PER_RUN = 4
 
-coordinator_team = Team(
-    name="Policy Analysis Team",
-    members=[information_retrieval_agent, analysis_agent],
-    model=OpenAIChat(
-        id="gpt-4o-mini",
-        api_key=LLM_MODEL_API_KEY,
-        base_url=LLM_MODEL_BASE_URL,
-        cache_response=True,
-        cache_ttl=7200,
-        cache_dir=".agno/cache/model_responses"
-    ),
-    tools=[PolicyTools],
-    instructions=dedent("""
-    You are the Coordinator managing a team for policy analysis.
+
+@lru_cache(maxsize=1)
+def get_team_rate_limiter() -> TokenBucketRateLimiter:
+    """Build the limiter from the configured limits, or from the provider's headers when probing is enabled"""
+    max_requests = float(LLM_MAX_REQUESTS_PER_MINUTE) if LLM_MAX_REQUESTS_PER_MINUTE else None
+    max_tokens = float(LLM_MAX_TOKENS_PER_MINUTE) if LLM_MAX_TOKENS_PER_MINUTE else None
     
+    if LLM_RATE_LIMIT_PROBE and max_requests is None and max_tokens is None:
+        try:
+            max_requests, max_tokens = probe_rate_limits("gpt-4o-mini")
+        except Exception as e:
+            logger.warning(f"Could not probe LLM rate limits: {e}")
+    
+    return TokenBucketRateLimiter(max_requests_per_minute=max_requests, max_tokens_per_minute=max_tokens)
+
+
+@lru_cache(maxsize=1)
+def get_semantic_cache() -> SemanticCache:
+    """Paraphrased policy questions are answered from here instead of re-running the team"""
+    return SemanticCache(
+        db_engine=get_db().db_engine,
+        table_name="policy_query_cache",
+        threshold=SEMANTIC_CACHE_THRESHOLD,
+        ttl=7200,  # Matches the coordinator model's cache_ttl
+    )
+
+
+@lru_cache(maxsize=1)
+def get_memory_tools() -> MemoryTools:
+    return MemoryTools(db=get_db())
+
+
+@lru_cache(maxsize=1)
+def get_memory_manager() -> MemoryManager:
+    return MemoryManager(
+        db=get_db(),
+        model=OpenAIChat(
+            id="gpt-4o-mini",
+            base_url=LLM_MODEL_BASE_URL,
+            client=openai_client,
+            async_client=async_openai_client,
+        ),
+        memory_capture_instructions="Extract and store key information about the user including their name, preferences, personal details etc.",
+    )
+
+
+_COORDINATOR_INSTRUCTIONS = dedent("""
+    You are the Coordinator managing a team for policy analysis.
+
     FORMATTING RULES (CRITICAL):
     1. Always include spaces between words
     2. Always include blank lines between sections (use double newlines)
@@ -63,37 +107,94 @@ coordinator_team = Team(
     4. NO duplicate content - return response ONCE only
     5. NO JSON structures
     6. Professional executive tone
-    
+
     MARKDOWN STRUCTURE:
-    
+
     ## Main Policy Title
-    
+
     Opening paragraph explaining the policy with proper spacing between words.
-    
+
     ### Key Points
-    
+
     - First bullet point with proper spacing
     - Second bullet point
-    
+
     ### Approval Process
-    
+
     | Level | Approver | Limit |
     |-------|----------|-------|
     | 1 | Manager | $5,000 |
     | 2 | Director | $25,000 |
-    
+
     **Note:** Always use proper punctuation, spacing, and formatting.
-    
+
     Team: IRA (retrieves docs) + AA (analyzes with tools)
-    
+
     Return ONLY clean markdown. NO JSON. NO duplicates. Proper spacing required.
-    """),
-    markdown=True,
-    debug_mode=True,
+    """)
+
+
+@lru_cache(maxsize=1)
+def get_coordinator_team() -> Team:
+    """Build the coordinator team and its members once per process"""
+    return Team(
+        name="Policy Analysis Team",
+        members=[get_information_retrieval_agent(), get_analysis_agent()],
+        model=OpenAIChat(
+            id="gpt-4o-mini",
+            api_key=LLM_MODEL_API_KEY,
+            base_url=LLM_MODEL_BASE_URL,
+            client=openai_client,
+            async_client=async_openai_client,
+            cache_response=True,
+            cache_ttl=7200,
+            cache_dir=AGNO_CACHE_DIR
+        ),
+        tools=[PolicyTools],
+        instructions=_COORDINATOR_INSTRUCTIONS,
+        markdown=True,
+        debug_mode=AGNO_DEBUG,
+    )
+
+
+# Probes for the first non-whitespace "{", "#" or "`" without copying the response the way .strip() does
+_LEADING_MARKER_RE = re.compile(r"\s*([{#`])")
+# A JSON object wrapped in a ```json fence, extracted in one scan
+_JSON_FENCE_RE = re.compile(r"\s*```json\s*(\{.*?\})\s*```", re.DOTALL)
+
+# Canned response metadata, allocated once instead of per query
+_DEFAULT_SOURCES = ("Organization Policies & Processes Manual",)
+_FALLBACK_TOOLS_USED = ('information_retrieval', 'analysis', 'knowledge_search')
+_MARKDOWN_REASONING_STEPS = (
+    "Information Retrieval Agent found relevant policy documents",
+    "Analysis Agent analyzed content with available tools",
+    "Coordinator generated comprehensive response",
+)
+_DECODE_ERROR_REASONING_STEPS = (
+    "Delegated query to Information Retrieval Agent",
+    "Retrieved relevant policy documents",
+    "Passed content to Analysis Agent",
+    "Analysis Agent processed content and used tools",
+    "Aggregated results into final response",
 )
+_FALLBACK_REASONING_STEPS = (
+    "Received query and initiated multi-agent workflow",
+    "Information Retrieval Agent searched knowledge base",
+    "Analysis Agent analyzed retrieved content",
+    "Coordinator aggregated results",
+    "Generated comprehensive response",
+)
+
+_STAIRCASE_PROMPT = dedent("""
+User question: {query}
+
+Retrieved policy content (output of the Information Retrieval Agent):
 
+{retrieved_content}
+""")
 
-def run_multi_agent_query(query: str, session_id: str) -> Dict[str, Any]:
+
+async def run_multi_agent_query(query: str, session_id: str) -> Dict[str, Any]:
     """
     Run a query through the multi-agent team system
     
@@ -104,63 +205,159 @@ def run_multi_agent_query(query: str, session_id: str) -> Dict[str, Any]:
     Returns:
         Dictionary with answer, sources, tools_used, and reasoning_steps
     """
-    print(f"\n[Team] Processing query through multi-agent system...")
-    print(f"[Team] Query: {query}")
+    logger.debug("[Team] Processing query through multi-agent system: %s", query)
+    
+    # Short-circuit the whole team run when a near-duplicate query was answered recently
+    query_embedding = await get_embedder().async_get_embedding(query)
+    cached_response = await asyncio.to_thread(get_semantic_cache().lookup, query_embedding)
+    if cached_response is not None:
+        logger.debug("[Team] Served from semantic cache")
+        return cached_response
+    
+    rate_limiter = await asyncio.to_thread(get_team_rate_limiter)
+    async with _TEAM_SEM:
+        await rate_limiter.acquire(requests=_TEAM_REQUESTS_PER_RUN, tokens=TEAM_TOKENS_PER_RUN)
+        
+        if TEAM_DISPATCH == "staircase":
+            result = await arun_staircase_query(query, session_id)
+        else:
+            # Run the team - it will coordinate between IRA and AA automatically
+            team_response = await get_coordinator_team().arun(
+                input=query,
+                session_id=session_id,
+                stream=False,
+            )
+            result = parse_team_response(team_response.content or "")
+    logger.debug("[Team] Processing complete")
+    
+    # Empty answers (a failed or cut-off run) would otherwise be replayed to every paraphrase
+    if result["answer"]:
+        await asyncio.to_thread(get_semantic_cache().store, query, query_embedding, result)
+    
+    return result
+
+
+async def stream_multi_agent_query(
+    query: str,
+    session_id: str,
+    max_interval_ms: float = 200,
+    max_chunks: int = 16,
+) -> AsyncIterator[List[str]]:
+    """
+    Stream the team's answer as batches of content deltas for chat UIs
     
-    # Run the team - it will coordinate between IRA and AA automatically
-    team_response = coordinator_team.run(
-        input=query,
+    Args:
+        query: User's question about policies
+        session_id: Session identifier for context management
+        max_interval_ms: Longest time a delta waits before its batch is yielded
+        max_chunks: Largest number of deltas in one batch
+        
+    Yields:
+        Lists of content deltas, in order
+    """
+    async def content_deltas() -> AsyncIterator[str]:
+        async for chunk in get_coordinator_team().arun(input=query, session_id=session_id, stream=True):
+            # Members' own events (the IRA's retrieval dump, tool results) are streamed too; only the team's answer is shown
+            if getattr(chunk, 'event', None) != TeamRunEvent.run_content:
+                continue
+            content = chunk.content
+            if isinstance(content, str) and content:
+                yield content
+    
+    # Same backpressure as run_multi_agent_query; the slot is held until the stream ends or is closed
+    rate_limiter = await asyncio.to_thread(get_team_rate_limiter)
+    async with _TEAM_SEM:
+        await rate_limiter.acquire(requests=_TEAM_REQUESTS_PER_RUN, tokens=TEAM_TOKENS_PER_RUN)
+        
+        async for batch in batch_chunks(content_deltas(), max_interval_ms=max_interval_ms, max_chunks=max_chunks):
+            yield batch
+
+
+async def arun_staircase_query(query: str, session_id: str) -> Dict[str, Any]:
+    """
+    Run IRA and AA as a fixed pipeline instead of the Team's coordinator-driven delegation
+    
+    IRA's output is consumed in full and handed to AA directly, which skips the coordinator's
+    own LLM calls for routing and aggregation. If IRA fails or returns nothing, the query is
+    answered by the Team instead.
+    
+    Args:
+        query: User's question about policies
+        session_id: Session identifier for context management
+        
+    Returns:
+        Dictionary with answer, sources, tools_used, and reasoning_steps
+    """
+    retrieved = []
+    try:
+        async for chunk in get_information_retrieval_agent().arun(input=query, session_id=session_id, stream=True):
+            event = getattr(chunk, 'event', None)
+            content = getattr(chunk, 'content', None)
+            # agno reports a failed run as an event instead of raising
+            if event == RunEvent.run_error:
+                raise RuntimeError(content or "Information Retrieval Agent run failed")
+            # Tool-call events carry content too; only the agent's own answer is handed to AA
+            if event == RunEvent.run_content and isinstance(content, str) and content:
+                retrieved.append(content)
+    except Exception as e:
+        logger.warning("[Team] Staircase retrieval failed, falling back to the team: %s", e)
+        retrieved = []
+    
+    if not retrieved:
+        team_response = await get_coordinator_team().arun(input=query, session_id=session_id, stream=False)
+        return parse_team_response(team_response.content or "")
+    
+    aa_response = await get_analysis_agent().arun(
+        input=_STAIRCASE_PROMPT.format(query=query, retrieved_content="".join(retrieved)),
         session_id=session_id,
-        stream=False,
     )
+    return parse_team_response(aa_response.content or "")
+
+
+def parse_team_response(final_result: str) -> Dict[str, Any]:
+    """
+    Build the response dictionary from the coordinator's final content
     
-    final_result = team_response.content if hasattr(team_response, 'content') else str(team_response)
-    print(f"[Team] Processing complete")
-    
-    # Parse the response
-    reasoning_steps = []
-    tools_used = []
-    sources = ["Organization Policies & Processes Manual"]
+    Fallback metadata is returned as shared module-level tuples; callers must treat it as read-only.
+    """
+    reasoning_steps = ()
+    tools_used = ()
+    sources = _DEFAULT_SOURCES
     answer = final_result
     
-    try:
-        # Check if response is JSON
-        if isinstance(final_result, str) and final_result.strip().startswith('{'):
-            parsed = json.loads(final_result)
-            reasoning_steps = parsed.get('reasoning_steps', [])
-            tools_used = parsed.get('tools_used', [])
+    marker = _LEADING_MARKER_RE.match(final_result) if isinstance(final_result, str) else None
+    first = marker.group(1) if marker else ''
+    
+    # Bare or fenced JSON; orjson is only invoked when the probe finds an object
+    payload = None
+    if first == '{':
+        payload = final_result
+    elif first == '`':
+        fence = _JSON_FENCE_RE.match(final_result)
+        payload = fence.group(1) if fence else None
+    
+    if payload is not None:
+        try:
+            parsed = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            # Rare: starts like JSON but isn't valid
+            reasoning_steps = _DECODE_ERROR_REASONING_STEPS
+            tools_used = _FALLBACK_TOOLS_USED
+        else:
+            reasoning_steps = parsed.get('reasoning_steps', ())
+            tools_used = parsed.get('tools_used', ())
             sources = parsed.get('sources', sources)
             answer = parsed.get('final_answer', final_result)
-        # If it's already markdown (not JSON), use it directly
-        elif isinstance(final_result, str) and final_result.strip().startswith('#'):
-            answer = final_result
-            reasoning_steps = [
-                "Information Retrieval Agent found relevant policy documents",
-                "Analysis Agent analyzed content with available tools",
-                "Coordinator generated comprehensive response"
-            ]
-            tools_used = ['information_retrieval', 'analysis', 'knowledge_search']
-    except json.JSONDecodeError:
-        reasoning_steps = [
-            "Delegated query to Information Retrieval Agent",
-            "Retrieved relevant policy documents",
-            "Passed content to Analysis Agent",
-            "Analysis Agent processed content and used tools",
-            "Aggregated results into final response"
-        ]
-        tools_used = ['information_retrieval', 'analysis', 'knowledge_search']
+    # If it's already markdown (not JSON), use it directly
+    elif first == '#':
+        reasoning_steps = _MARKDOWN_REASONING_STEPS
+        tools_used = _FALLBACK_TOOLS_USED
     
     if not reasoning_steps:
-        reasoning_steps = [
-            "Received query and initiated multi-agent workflow",
-            "Information Retrieval Agent searched knowledge base",
-            "Analysis Agent analyzed retrieved content",
-            "Coordinator aggregated results",
-            "Generated comprehensive response"
-        ]
+        reasoning_steps = _FALLBACK_REASONING_STEPS
     
     if not tools_used:
-        tools_used = ['information_retrieval', 'analysis', 'knowledge_search']
+        tools_used = _FALLBACK_TOOLS_USED
     
     return {
         "answer": answer,
@@ -168,4 +365,3 @@ def run_multi_agent_query(query: str, session_id: str) -> Dict[str, Any]:
         "tools_used": tools_used,
         "reasoning_steps": reasoning_steps
     }
-
@@ -4,60 +4,37 @@ Retrieves relevant text chunks from policy documents
 """
 import os
 from dotenv import load_dotenv
+from functools import lru_cache
 from textwrap import dedent
 
 from agno.agent.agent import Agent
 from agno.models.openai import OpenAIChat
-from agno.knowledge.knowledge import Knowledge
-from agno.vectordb.pgvector import PgVector, SearchType
-from agno.knowledge.embedder.openai import OpenAIEmbedder
+
+from agno.vectordb.pgvector import SearchType
+from agno.vectordb.pgvector.index import HNSW
+
+from app.clients import VECTOR_HALF_PRECISION, openai_client, async_openai_client, get_db, get_embedder
+from app.knowledge import CachedKnowledge, RRFPgVector
 
 load_dotenv()
 
 # Get environment variables
-POSTGRES_DB_URL = os.getenv("POSTGRES_DB_URL")
 LLM_MODEL_API_KEY = os.getenv("LLM_MODEL_API_KEY")
 LLM_MODEL_BASE_URL = os.getenv("LLM_MODEL_BASE_URL")
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
 
 os.environ["OPENAI_API_KEY"] = LLM_MODEL_API_KEY
 
-embedder = OpenAIEmbedder(
-    id=EMBEDDING_MODEL,
-    api_key=LLM_MODEL_API_KEY,
-    base_url=LLM_MODEL_BASE_URL,
-    dimensions=768
-)
-
-knowledge = Knowledge(
-    vector_db=PgVector(
-        table_name="organization_policies_processes_vectors",
-        db_url=POSTGRES_DB_URL,
-        search_type=SearchType.hybrid,
-        embedder=embedder,
-    ),
-    max_results=3,
-)
-
-information_retrieval_agent = Agent(
-    name="Information Retrieval Agent",
-    model=OpenAIChat(
-        id="gpt-4o-mini",
-        api_key=LLM_MODEL_API_KEY,
-        base_url=LLM_MODEL_BASE_URL,
-    ),
-    description="Retrieves relevant policy document chunks based on queries.",
-    instructions=dedent("""
+_IRA_INSTRUCTIONS = dedent("""
     You are an Information Retrieval Agent specialized in finding relevant policy information.
-    
+
     IMPORTANT: Do NOT use conversational fillers or introductory remarks. 
     Focus ONLY on retrieving and returning the requested information in JSON format.
-    
+
     Your task:
     1. Search the knowledge base for relevant policy sections
     2. Return the most relevant content chunks
     3. Provide source information
-    
+
     Return your findings in JSON format:
     {
         "retrieved_content": [
@@ -69,10 +46,35 @@ information_retrieval_agent = Agent(
         ],
         "total_chunks": number
     }
-    """),
-    knowledge=knowledge,
-    search_knowledge=True,
-    add_knowledge_to_context=True,
-    markdown=True,
-)
+    """)
+
 
+@lru_cache(maxsize=1)
+def get_information_retrieval_agent() -> Agent:
+    """Build the Information Retrieval Agent once per process"""
+    return Agent(
+        name="Information Retrieval Agent",
+        model=OpenAIChat(
+            id="gpt-4o-mini",
+            api_key=LLM_MODEL_API_KEY,
+            base_url=LLM_MODEL_BASE_URL,
+            client=openai_client,
+            async_client=async_openai_client,
+        ),
+        description="Retrieves relevant policy document chunks based on queries.",
+        instructions=_IRA_INSTRUCTIONS,
+        knowledge=CachedKnowledge(
+            vector_db=RRFPgVector(
+                table_name="organization_policies_processes_vectors",
+                db_engine=get_db().db_engine,
+                search_type=SearchType.hybrid,
+                vector_index=HNSW(m=16, ef_construction=64),  # ef_search is sized per query
+                embedder=get_embedder(),
+                half_precision=VECTOR_HALF_PRECISION,
+            ),
+            max_results=3,
+        ),
+        search_knowledge=True,
+        add_knowledge_to_context=True,
+        markdown=True,
+    )
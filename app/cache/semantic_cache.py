@@ -0,0 +1,130 @@
+"""
+Semantic Cache
+Stores query responses keyed on the query embedding so paraphrased policy questions skip the agent pipeline
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import BigInteger, Column, DateTime, Index, MetaData, Table, Text, create_engine, delete, insert, select, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Engine
+
+from agno.utils.log import logger
+
+
+class SemanticCache:
+    """
+    Postgres/pgvector backed cache of query responses.
+
+    A lookup returns the stored response of the closest cached query when its
+    cosine similarity is at least `threshold` and the entry is younger than `ttl` seconds.
+    Entries stored with a `scope` (e.g. a session id) are only served to lookups with the same scope.
+    Expired entries are deleted on every store, so they neither grow the table nor crowd fresh
+    entries out of the HNSW scan that the age filter is applied after.
+    """
+
+    def __init__(
+        self,
+        db_url: Optional[str] = None,
+        table_name: str = "policy_query_cache",
+        schema: str = "ai",
+        dimensions: int = 768,
+        threshold: float = 0.95,
+        ttl: int = 7200,
+        db_engine: Optional[Engine] = None,
+    ):
+        if db_engine is None and db_url is None:
+            raise ValueError("Either db_url or db_engine is required")
+
+        self.engine = db_engine or create_engine(db_url)
+        self.schema = schema
+        self.threshold = threshold
+        self.ttl = ttl
+        self._table_ready = False
+
+        self.table = Table(
+            table_name,
+            MetaData(schema=schema),
+            Column("id", BigInteger, primary_key=True, autoincrement=True),
+            Column("query", Text, nullable=False),
+            Column("scope", Text, nullable=False, server_default=""),
+            Column("embedding", Vector(dimensions), nullable=False),
+            Column("response", JSONB, nullable=False),
+            Column("created_at", DateTime(timezone=True), nullable=False),
+            Index(
+                f"{table_name}_embedding_hnsw",
+                "embedding",
+                postgresql_using="hnsw",
+                postgresql_with={"m": 16, "ef_construction": 64},
+                postgresql_ops={"embedding": "vector_cosine_ops"},
+            ),
+            Index(f"{table_name}_created_at_idx", "created_at"),
+            Index(f"{table_name}_scope_idx", "scope"),
+        )
+
+    def _ensure_table(self) -> None:
+        # Create the table lazily so importing the agents never touches the database
+        if self._table_ready:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {self.schema}"))
+        self.table.metadata.create_all(self.engine, checkfirst=True)
+        # Tables created before scoping existed get the column (and its index) added in place
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(f"ALTER TABLE {self.schema}.{self.table.name} ADD COLUMN IF NOT EXISTS scope text NOT NULL DEFAULT ''")
+            )
+            conn.execute(
+                text(f"CREATE INDEX IF NOT EXISTS {self.table.name}_scope_idx ON {self.schema}.{self.table.name} (scope)")
+            )
+        self._table_ready = True
+
+    def lookup(self, embedding: List[float], scope: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Return the cached response closest to `embedding` within `scope`, or None on a miss.
+        """
+        self._ensure_table()
+
+        distance = self.table.c.embedding.cosine_distance(embedding)
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        stmt = (
+            select(self.table.c.response, distance.label("distance"))
+            .where(self.table.c.created_at >= cutoff)
+            .where(self.table.c.scope == scope)
+            .order_by(distance)
+            .limit(1)
+        )
+
+        with self.engine.connect() as conn:
+            row = conn.execute(stmt).first()
+
+        if row is None:
+            return None
+
+        similarity = 1 - row.distance
+        if similarity < self.threshold:
+            return None
+
+        logger.info(f"Semantic cache hit (similarity={similarity:.3f})")
+        return row.response
+
+    def store(self, query: str, embedding: List[float], response: Dict[str, Any], scope: str = "") -> None:
+        """
+        Insert a response for `query` into the cache, visible only to lookups in `scope`, and purge expired entries.
+        """
+        self._ensure_table()
+
+        now = datetime.now(timezone.utc)
+        with self.engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.created_at < now - timedelta(seconds=self.ttl)))
+            conn.execute(
+                insert(self.table).values(
+                    query=query,
+                    scope=scope,
+                    embedding=embedding,
+                    response=response,
+                    created_at=now,
+                )
+            )
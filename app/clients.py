@@ -0,0 +1,143 @@
+"""
+Shared API clients
+Connection pools reused by every agent in the process
+"""
+import os
+from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, DefaultAioHttpClient, OpenAI
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+
+from agno.db.postgres import PostgresDb
+
+from app.embeddings import BatchEmbedder
+
+load_dotenv()
+
+# Get environment variables
+POSTGRES_DB_URL = os.getenv("POSTGRES_DB_URL")
+LLM_MODEL_API_KEY = os.getenv("LLM_MODEL_API_KEY")
+LLM_MODEL_BASE_URL = os.getenv("LLM_MODEL_BASE_URL")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
+HTTPX_MAX_CONNECTIONS = int(os.getenv("HTTPX_MAX_CONNECTIONS", "2000"))
+HTTPX_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTPX_MAX_KEEPALIVE_CONNECTIONS", "1500"))
+HTTPX_TIMEOUT = float(os.getenv("HTTPX_TIMEOUT", "120"))
+# "aiohttp" keeps async throughput flat under high fan-out, "httpx" keeps HTTP/2 multiplexing
+OPENAI_ASYNC_TRANSPORT = os.getenv("OPENAI_ASYNC_TRANSPORT", "aiohttp")
+# Model response cache on tmpfs when available, so cache reads/writes never touch a shared or network disk
+AGNO_CACHE_DIR = os.getenv("AGNO_CACHE_DIR") or (
+    "/dev/shm/agno-cache" if os.path.isdir("/dev/shm") else ".agno/cache/model_responses"
+)
+# Concurrent async query embeddings are coalesced into one request per window / batch
+EMBED_FLUSH_MS = float(os.getenv("EMBED_FLUSH_MS", "5"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+# Store policy embeddings as FP16 halfvec (see app.knowledge.RRFPgVector); the API and the vectorizer must agree
+VECTOR_HALF_PRECISION = os.getenv("VECTOR_HALF_PRECISION") == "1"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Server-side prepare after N executions of the same statement (psycopg3 only, empty to disable e.g. behind PgBouncer)
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "1")
+
+os.makedirs(AGNO_CACHE_DIR, exist_ok=True)
+
+http_limits = httpx.Limits(
+    max_connections=HTTPX_MAX_CONNECTIONS,
+    max_keepalive_connections=HTTPX_MAX_KEEPALIVE_CONNECTIONS,
+)
+
+# agno uses the sync client for .run() and the async client for .arun()
+http_client = httpx.Client(http2=True, limits=http_limits, timeout=HTTPX_TIMEOUT)
+if OPENAI_ASYNC_TRANSPORT == "aiohttp":
+    # httpx.AsyncClient backed by an aiohttp transport (see openai-python issue #1596)
+    async_http_client = DefaultAioHttpClient(limits=http_limits, timeout=HTTPX_TIMEOUT)
+else:
+    async_http_client = httpx.AsyncClient(http2=True, limits=http_limits, timeout=HTTPX_TIMEOUT)
+
+openai_client = OpenAI(
+    api_key=LLM_MODEL_API_KEY,
+    base_url=LLM_MODEL_BASE_URL,
+    http_client=http_client,
+)
+
+async_openai_client = AsyncOpenAI(
+    api_key=LLM_MODEL_API_KEY,
+    base_url=LLM_MODEL_BASE_URL,
+    http_client=async_http_client,
+)
+
+
+# Embeds knowledge-base searches and semantic-cache keys over the same connection pools;
+# concurrent async embeds from every agent are coalesced into one embeddings call
+embedder = BatchEmbedder(
+    id=EMBEDDING_MODEL,
+    api_key=LLM_MODEL_API_KEY,
+    base_url=LLM_MODEL_BASE_URL,
+    dimensions=768,
+    openai_client=openai_client,
+    async_client=async_openai_client,
+    cache_size=4096,
+    batch_size=EMBED_BATCH_SIZE,
+    flush_interval_ms=EMBED_FLUSH_MS,
+)
+
+
+def get_embedder() -> BatchEmbedder:
+    """Return the process-wide query embedder"""
+    return embedder
+
+
+@lru_cache(maxsize=1)
+def get_db_engine() -> Engine:
+    """Return the single SQLAlchemy connection pool shared by storage, memories, vector search and caches"""
+    connect_args = {}
+    if DB_PREPARE_THRESHOLD and make_url(POSTGRES_DB_URL).get_driver_name() == "psycopg":
+        # Repeated ANN searches, memory upserts and session fetches skip parse/plan once prepared
+        connect_args["prepare_threshold"] = int(DB_PREPARE_THRESHOLD)
+
+    return create_engine(
+        POSTGRES_DB_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_db() -> PostgresDb:
+    """Return the PostgresDb whose engine backs agent storage, memories and the policy vector store"""
+    return PostgresDb(db_engine=get_db_engine())
+
+
+async def close_clients() -> None:
+    """Release the shared HTTP and database pools on application shutdown"""
+    await async_openai_client.close()
+    openai_client.close()
+    get_db_engine().dispose()
+
+
+def probe_rate_limits(model: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Read the provider's requests/tokens-per-minute limits from the headers of a 1-token request.
+
+    Returns (None, None) when the endpoint does not report them (e.g. LM Studio).
+    """
+    raw = openai_client.chat.completions.with_raw_response.create(
+        model=model,
+        messages=[{"role": "user", "content": "ping"}],
+        max_tokens=1,
+    )
+
+    def _header(name: str) -> Optional[int]:
+        value = raw.headers.get(name)
+        return int(value) if value and value.isdigit() else None
+
+    return _header("x-ratelimit-limit-requests"), _header("x-ratelimit-limit-tokens")
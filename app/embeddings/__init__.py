@@ -0,0 +1,5 @@
+from .cached_embedder import CachedOpenAIEmbedder
+from .batch_embedder import BatchEmbedder
+from .concurrent_batch_embedder import ConcurrentBatchEmbedder
+
+__all__ = ["CachedOpenAIEmbedder", "BatchEmbedder", "ConcurrentBatchEmbedder"]
@@ -0,0 +1,100 @@
+"""
+Batch Embedder
+Coalesces concurrent async query embeddings into one embeddings.create(input=[...]) call
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from .cached_embedder import CachedOpenAIEmbedder
+
+
+@dataclass
+class BatchEmbedder(CachedOpenAIEmbedder):
+    """
+    CachedOpenAIEmbedder whose async cache misses are buffered for up to flush_interval_ms
+    (or until batch_size texts are pending) and embedded in a single request.
+
+    Concurrent requests for the same text share one future. The sync get_embedding path is
+    left unbatched since it has no event loop to wait on.
+    """
+
+    batch_size: int = 16
+    flush_interval_ms: float = 20
+    _pending: Dict[bytes, "tuple[str, asyncio.Future]"] = field(default_factory=dict, init=False, repr=False)
+    _flush_handle: Optional[asyncio.TimerHandle] = field(default=None, init=False, repr=False)
+    _loop: Optional[asyncio.AbstractEventLoop] = field(default=None, init=False, repr=False)
+    # The loop only keeps weak references to tasks; an unreferenced flush could be collected mid-request
+    _flush_tasks: Set[asyncio.Task] = field(default_factory=set, init=False, repr=False)
+
+    def _embedding_request_params(self, texts: List[str]) -> Dict[str, Any]:
+        # Mirrors OpenAIEmbedder.response() with a list input
+        request_params: Dict[str, Any] = {
+            "input": texts,
+            "model": self.id,
+            "encoding_format": self.encoding_format,
+        }
+        if self.user is not None:
+            request_params["user"] = self.user
+        if self.id.startswith("text-embedding-3"):
+            request_params["dimensions"] = self.dimensions
+        if self.request_params:
+            request_params.update(self.request_params)
+        return request_params
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch = self._pending
+        self._pending = {}
+        task = self._loop.create_task(self._flush(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, batch: Dict[bytes, "tuple[str, asyncio.Future]"]) -> None:
+        keys = list(batch)
+        texts = [batch[key][0] for key in keys]
+        try:
+            response = await self.aclient.embeddings.create(**self._embedding_request_params(texts))
+            embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            for _, future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, embedding in zip(keys, embeddings):
+            self._put_cached(key, embedding)
+            future = batch[key][1]
+            if not future.done():
+                future.set_result(embedding)
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        key = self._cache_key(text)
+        vector = self._get_cached(key)
+        if vector is not None:
+            return vector.tolist()
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First call, or a new event loop (e.g. a second asyncio.run): drop state bound to the old one
+            self._loop = loop
+            self._pending = {}
+            self._flush_handle = None
+            self._flush_tasks = set()
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending[1])
+
+        future = loop.create_future()
+        self._pending[key] = (text, future)
+        if len(self._pending) >= self.batch_size:
+            self._schedule_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval_ms / 1000, self._schedule_flush)
+
+        return await asyncio.shield(future)
@@ -0,0 +1,71 @@
+"""
+Cached OpenAI Embedder
+Serves repeated identical queries from an in-process LRU instead of an embeddings round-trip
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+
+from agno.knowledge.embedder.openai import OpenAIEmbedder
+
+
+@dataclass
+class CachedOpenAIEmbedder(OpenAIEmbedder):
+    """
+    OpenAIEmbedder whose query embeddings are memoized by a blake2b hash of the normalized
+    (lowercased, whitespace-collapsed) text.
+
+    Vectors are kept as float32 arrays (3 KB each at 768 dimensions), so the default
+    4096 entries cap the cache at roughly 12 MB.
+    """
+
+    cache_size: int = 4096
+    _cache: "OrderedDict[bytes, np.ndarray]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @staticmethod
+    def _cache_key(text: str) -> bytes:
+        # Case and whitespace variants of a query share one entry (embedded from the first variant seen)
+        normalized = " ".join(text.lower().split())
+        # Non-cryptographic use: blake2b is faster than sha256 and collision-safe enough here
+        return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+
+    def _get_cached(self, key: bytes):
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+            return vector
+
+    def _put_cached(self, key: bytes, embedding: List[float]) -> None:
+        if not embedding:
+            return
+        with self._lock:
+            self._cache[key] = np.asarray(embedding, dtype=np.float32)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def get_embedding(self, text: str) -> List[float]:
+        key = self._cache_key(text)
+        vector = self._get_cached(key)
+        if vector is not None:
+            return vector.tolist()
+
+        embedding = super().get_embedding(text)
+        self._put_cached(key, embedding)
+        return embedding
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        key = self._cache_key(text)
+        vector = self._get_cached(key)
+        if vector is not None:
+            return vector.tolist()
+
+        embedding = await super().async_get_embedding(text)
+        self._put_cached(key, embedding)
+        return embedding
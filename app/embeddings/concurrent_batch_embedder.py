@@ -0,0 +1,44 @@
+"""
+Concurrent Batch Embedder
+Sends ingestion embedding batches concurrently instead of one after another
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .cached_embedder import CachedOpenAIEmbedder
+
+
+@dataclass
+class ConcurrentBatchEmbedder(CachedOpenAIEmbedder):
+    """
+    CachedOpenAIEmbedder whose async batch path keeps up to max_concurrency embeddings.create(input=[...])
+    requests in flight, hiding request latency during bulk ingestion.
+
+    Each batch still goes through OpenAIEmbedder's own batch call (including its per-text fallback),
+    and results are reassembled in input order. Single-text query embeddings are served from the LRU.
+    """
+
+    enable_batch: bool = True
+    max_concurrency: int = 8
+
+    async def async_get_embeddings_batch_and_usage(
+        self, texts: List[str]
+    ) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        parent = super()
+
+        async def embed_batch(batch: List[str]) -> Tuple[List[List[float]], List[Optional[Dict]]]:
+            async with semaphore:
+                return await parent.async_get_embeddings_batch_and_usage(batch)
+
+        results = await asyncio.gather(
+            *(embed_batch(texts[i : i + self.batch_size]) for i in range(0, len(texts), self.batch_size))
+        )
+
+        embeddings: List[List[float]] = []
+        usage: List[Optional[Dict]] = []
+        for batch_embeddings, batch_usage in results:
+            embeddings.extend(batch_embeddings)
+            usage.extend(batch_usage)
+        return embeddings, usage
@@ -0,0 +1,5 @@
+from .cached_knowledge import CachedKnowledge
+from .router import KnowledgeRouter
+from .rrf_pgvector import RRFPgVector
+
+__all__ = ["CachedKnowledge", "KnowledgeRouter", "RRFPgVector"]
@@ -0,0 +1,144 @@
+"""
+Cached Knowledge
+Serves repeated knowledge-base searches from an in-process TTL cache instead of another embed + hybrid query
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from agno.knowledge.document import Document
+from agno.knowledge.knowledge import Knowledge
+
+
+@dataclass
+class CachedKnowledge(Knowledge):
+    """
+    Knowledge whose unfiltered searches are memoized by (query, max_results).
+
+    The SSE handler's explicit source lookup and the agent's own context retrieval
+    issue the same search; whichever runs second (or concurrently) is served from here.
+    Filtered searches always go to the vector store.
+
+    Concurrent identical searches are coalesced separately per calling convention: sync
+    callers wait on a concurrent.futures.Future, async callers on an asyncio.Future of
+    their loop. A sync caller never waits on an async search, whose progress may need the
+    very event-loop thread it would block.
+    """
+
+    cache_size: int = 1024
+    cache_ttl: float = 300
+    _search_cache: Optional[TTLCache] = field(default=None, init=False, repr=False)
+    _search_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _inflight: Dict[Tuple[str, int], Future] = field(default_factory=dict, init=False, repr=False)
+    _async_inflight: Dict[Tuple[str, int], asyncio.Future] = field(default_factory=dict, init=False, repr=False)
+
+    def _cache_key(self, query: str, max_results: Optional[int]) -> Tuple[str, int]:
+        return query, max_results or self.max_results
+
+    def _cached(self, key: Tuple[str, int]) -> Optional[List[Document]]:
+        with self._search_lock:
+            return self._search_cache.get(key) if self._search_cache is not None else None
+
+    def _remember(self, key: Tuple[str, int], documents: List[Document]) -> None:
+        with self._search_lock:
+            if self._search_cache is None:
+                self._search_cache = TTLCache(maxsize=self.cache_size, ttl=self.cache_ttl)
+            self._search_cache[key] = documents
+
+    def _claim(self, key: Tuple[str, int]) -> Tuple[Optional[List[Document]], Optional[Future], bool]:
+        """Return (cached documents, in-flight sync future, whether the caller must run the search)"""
+        with self._search_lock:
+            if self._search_cache is not None:
+                documents = self._search_cache.get(key)
+                if documents is not None:
+                    return documents, None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                return None, future, False
+            future = Future()
+            self._inflight[key] = future
+            return None, future, True
+
+    def search(
+        self,
+        query: str,
+        max_results: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> List[Document]:
+        if filters or kwargs:
+            return super().search(query, max_results=max_results, filters=filters, **kwargs)
+
+        key = self._cache_key(query, max_results)
+        documents, future, leader = self._claim(key)
+        if documents is not None:
+            return list(documents)
+        if not leader:
+            # The leader is another sync caller running the search in its own thread
+            return list(future.result())
+
+        try:
+            documents = super().search(query, max_results=max_results)
+        except BaseException as e:
+            with self._search_lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+        self._remember(key, documents)
+        with self._search_lock:
+            self._inflight.pop(key, None)
+        future.set_result(documents)
+        return list(documents)
+
+    async def async_search(
+        self,
+        query: str,
+        max_results: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> List[Document]:
+        if filters or kwargs:
+            return await super().async_search(query, max_results=max_results, filters=filters, **kwargs)
+
+        key = self._cache_key(query, max_results)
+        documents = self._cached(key)
+        if documents is not None:
+            return list(documents)
+        loop = asyncio.get_running_loop()
+        while (future := self._async_inflight.get(key)) is not None and future.get_loop() is loop:
+            try:
+                # Shielded: a cancelled follower must not cancel the leader's result for the others
+                return list(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leader itself was cancelled: claim the search again
+
+        future = loop.create_future()
+        self._async_inflight[key] = future
+        try:
+            # Embed through the embedder's async path first (coalesced with concurrent queries by
+            # BatchEmbedder); the vector store's own embed call is then an LRU hit even when it
+            # runs the sync search in a worker thread
+            embedder = getattr(self.vector_db, "embedder", None)
+            if embedder is not None:
+                await embedder.async_get_embedding(query)
+            documents = await super().async_search(query, max_results=max_results)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Followers re-raise it; without any, asyncio would log it as never retrieved
+            future.exception()
+            raise
+        finally:
+            if self._async_inflight.get(key) is future:
+                del self._async_inflight[key]
+        self._remember(key, documents)
+        future.set_result(documents)
+        return list(documents)
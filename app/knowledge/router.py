@@ -0,0 +1,97 @@
+"""
+Knowledge Router
+Picks vector-only or hybrid retrieval per query and skips retrieval for small talk
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+from agno.knowledge.document import Document
+from agno.knowledge.knowledge import Knowledge
+
+# Quoted phrases and acronyms / policy codes (e.g. "HR-12", SLA) benefit from the lexical pass
+_QUOTED_RE = re.compile(r'"[^"]+"')
+_SMALLTALK_RE = re.compile(
+    r"^\s*(hi|hello|hey|thanks|thank you|ok|okay|bye|good (morning|afternoon|evening))\b[\s!.?]*$",
+    re.IGNORECASE,
+)
+
+
+def needs_lexical(query: str) -> bool:
+    """True when exact-term matching is likely to matter more than semantic similarity"""
+    return any(token.isupper() and len(token) > 2 for token in query.split()) or bool(_QUOTED_RE.search(query))
+
+
+def is_smalltalk(query: str) -> bool:
+    """True for greetings and acknowledgements that never need policy context"""
+    return bool(_SMALLTALK_RE.match(query))
+
+
+def adaptive_max_results(query: str, max_results: int = 3) -> int:
+    """Fetch fewer chunks for short questions, up to max_results for long ones"""
+    return min(max_results, 1 + len(query.split()) // 8)
+
+
+class KnowledgeRouter:
+    """Routes each search to the vector-only or hybrid knowledge base over the same table"""
+
+    def __init__(self, vector_knowledge: Knowledge, hybrid_knowledge: Knowledge, max_results: int = 3):
+        self.vector_knowledge = vector_knowledge
+        self.hybrid_knowledge = hybrid_knowledge
+        self.max_results = max_results
+
+    def retrieval_path(self, query: str) -> str:
+        """Label for the path search() takes: skipped, hybrid or vector"""
+        if is_smalltalk(query):
+            return "skipped"
+        return "hybrid" if needs_lexical(query) else "vector"
+
+    def select(self, query: str) -> Knowledge:
+        return self.hybrid_knowledge if needs_lexical(query) else self.vector_knowledge
+
+    def search(self, query: str, max_results: Optional[int] = None) -> List[Document]:
+        if is_smalltalk(query):
+            return []
+        return self.select(query).search(query, max_results=adaptive_max_results(query, max_results or self.max_results))
+
+    async def async_search(self, query: str, max_results: Optional[int] = None) -> List[Document]:
+        if is_smalltalk(query):
+            return []
+        return await self.select(query).async_search(
+            query, max_results=adaptive_max_results(query, max_results or self.max_results)
+        )
+
+    def retrieve(
+        self,
+        query: str,
+        num_documents: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Agent knowledge_retriever hook for synchronous runs"""
+        if is_smalltalk(query):
+            return None
+        knowledge = self.select(query)
+        max_results = adaptive_max_results(query, num_documents or self.max_results)
+        if filters:
+            documents = knowledge.search(query, max_results=max_results, filters=filters)
+        else:
+            documents = knowledge.search(query, max_results=max_results)
+        return [document.to_dict() for document in documents]
+
+    async def aretrieve(
+        self,
+        query: str,
+        num_documents: Optional[int] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Agent knowledge_retriever hook for arun: agno awaits it on the event loop, so the search must not block"""
+        if is_smalltalk(query):
+            return None
+        knowledge = self.select(query)
+        max_results = adaptive_max_results(query, num_documents or self.max_results)
+        if filters:
+            documents = await knowledge.async_search(query, max_results=max_results, filters=filters)
+        else:
+            documents = await knowledge.async_search(query, max_results=max_results)
+        return [document.to_dict() for document in documents]
@@ -0,0 +1,352 @@
+"""
+RRF PgVector
+Hybrid search as one SQL statement: index-ordered vector and keyword rankings fused with Reciprocal Rank Fusion,
+plus COPY-based bulk loading for ingestion
+"""
+import asyncio
+import io
+import os
+from hashlib import md5
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from pgvector.sqlalchemy import HALFVEC
+from sqlalchemy import Float, bindparam, cast, column, delete, func, inspect, select, text, union_all
+
+from agno.knowledge.document import Document
+from agno.utils.log import log_debug, logger
+from agno.vectordb.pgvector import PgVector
+from agno.vectordb.pgvector.index import HNSW, Ivfflat
+
+# Per-query HNSW candidate list: max(10, multiplier * results, hybrid per-branch LIMIT) instead of a fixed ef_search
+HNSW_EF_SEARCH_MULT = int(os.getenv("HNSW_EF_SEARCH_MULT", "4"))
+# Memory for the fusion's sorts and hash aggregate, set per search transaction
+WORK_MEM = os.getenv("WORK_MEM", "64MB")
+
+# COPY text format: backslash escapes for the separators, \N for NULL
+_COPY_TEXT_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_text_line(row: tuple) -> str:
+    return "\t".join("\\N" if value is None else str(value).translate(_COPY_TEXT_ESCAPES) for value in row) + "\n"
+
+
+class RRFPgVector(PgVector):
+    """
+    PgVector whose hybrid_search ranks the vector and keyword branches separately and fuses them
+    server-side with score = sum(1 / (rrf_k + rank)).
+
+    agno's hybrid query orders by a weighted sum of cosine similarity and ts_rank, an expression
+    the HNSW index can't serve, so every hybrid search scans the table. Here each branch orders
+    by its bare operator (embedding <=> query, ts_rank over the GIN-indexed tsvector) with its
+    own LIMIT, so both stay index scans and the fusion only touches 2 * branch_limit rows. Metadata
+    filters are applied to those fused candidates, after ranking.
+
+    optimize() also adds a stored tsvector column (tsv_column) with its own GIN index, so the
+    keyword branch reads the persisted vector instead of calling to_tsvector per row. Until that
+    column exists searches fall back to agno's to_tsvector expression index.
+
+    With half_precision the embedding column is stored as halfvec (FP16, half the bytes per row
+    and per HNSW distance computation) behind a halfvec_cosine_ops index, and query vectors are
+    cast to halfvec to match. Every RRFPgVector over the table must use the same setting.
+
+    vector_search is overridden too, so vector-only queries get the same per-query hnsw.ef_search
+    sizing (HNSW's fixed ef_search is ignored) and the halfvec cast.
+    """
+
+    def __init__(
+        self,
+        *args,
+        rrf_k: int = 60,
+        branch_limit: int = 10,
+        tsv_column: str = "content_tsv",
+        half_precision: bool = False,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.rrf_k = rrf_k
+        self.branch_limit = branch_limit
+        self.tsv_column = tsv_column
+        self.half_precision = half_precision
+        self._has_tsv_column: Optional[bool] = None
+
+    def _ensure_half_precision(self, conn) -> None:
+        """Convert the embedding column to halfvec and index it with halfvec_cosine_ops"""
+        table = f'"{self.schema}"."{self.table_name}"'
+        column_type = conn.execute(
+            text(
+                "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = CAST(:table AS regclass) AND attname = 'embedding'"
+            ),
+            {"table": table},
+        ).scalar()
+        if not column_type.startswith("halfvec"):
+            # vector_* operator-class indexes can't survive the type change
+            index_names = conn.execute(
+                text(
+                    "SELECT indexname FROM pg_indexes WHERE schemaname = :schema AND tablename = :table_name "
+                    "AND indexdef LIKE '%vector_%_ops%'"
+                ),
+                {"schema": self.schema, "table_name": self.table_name},
+            ).scalars()
+            for index_name in list(index_names):
+                conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.schema}"."{index_name}"'))
+            conn.execute(
+                text(
+                    f"ALTER TABLE {table} ALTER COLUMN embedding TYPE halfvec({self.dimensions}) "
+                    f"USING embedding::halfvec({self.dimensions})"
+                )
+            )
+        index_options = ""
+        if isinstance(self.vector_index, HNSW):
+            index_options = f" WITH (m = {self.vector_index.m}, ef_construction = {self.vector_index.ef_construction})"
+        conn.execute(
+            text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.table_name}_embedding_halfvec_hnsw "
+                f"ON {table} USING hnsw (embedding halfvec_cosine_ops){index_options}"
+            )
+        )
+
+    def optimize(self, force_recreate: bool = False) -> None:
+        if not self.half_precision:
+            super().optimize(force_recreate=force_recreate)
+        table = f'"{self.schema}"."{self.table_name}"'
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+        with self.db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if self.half_precision:
+                # agno's optimize() would build a vector_cosine_ops index the halfvec column can't use
+                self._ensure_half_precision(conn)
+            conn.execute(
+                text(
+                    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {self.tsv_column} tsvector "
+                    f"GENERATED ALWAYS AS (to_tsvector('{self.content_language}', content)) STORED"
+                )
+            )
+            conn.execute(
+                text(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.table_name}_{self.tsv_column}_gin "
+                    f"ON {table} USING GIN ({self.tsv_column})"
+                )
+            )
+        self._has_tsv_column = True
+
+    def _ts_vector(self):
+        if self._has_tsv_column is None:
+            columns = inspect(self.db_engine).get_columns(self.table_name, schema=self.schema)
+            self._has_tsv_column = any(col["name"] == self.tsv_column for col in columns)
+        if self._has_tsv_column:
+            return column(self.tsv_column)
+        # Same expression as agno's GIN index, so the planner can use it
+        return func.to_tsvector(self.content_language, self.table.c.content)
+
+    def hybrid_search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        query_embedding = self.embedder.get_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Error getting embedding for Query: {query}")
+            return []
+
+        table = self.table
+        branch_limit = max(self.branch_limit, limit)
+
+        ts_vector = self._ts_vector()
+        ts_query = func.plainto_tsquery(self.content_language, query)
+        ts_rank = func.ts_rank_cd(ts_vector, ts_query)
+        distance = self._cosine_distance(query_embedding)
+
+        # Rank outside the LIMITed scans: a window over the table itself would sort every row first
+        vector_top = select(table.c.id, distance.label("distance")).order_by(distance).limit(branch_limit)
+        keyword_top = (
+            select(table.c.id, ts_rank.label("ts_rank"))
+            .where(ts_vector.op("@@")(ts_query))
+            .order_by(ts_rank.desc())
+            .limit(branch_limit)
+        )
+        vector_top = vector_top.subquery("vector_top")
+        keyword_top = keyword_top.subquery("keyword_top")
+
+        vector_ranked = select(vector_top.c.id, func.row_number().over(order_by=vector_top.c.distance).label("rank"))
+        keyword_ranked = select(
+            keyword_top.c.id, func.row_number().over(order_by=keyword_top.c.ts_rank.desc()).label("rank")
+        )
+
+        ranks = union_all(vector_ranked, keyword_ranked).subquery("ranks")
+        fused = (
+            select(ranks.c.id, func.sum(1.0 / (self.rrf_k + ranks.c.rank)).label("score"))
+            .group_by(ranks.c.id)
+            .subquery("fused")
+        )
+        stmt = (
+            select(
+                table.c.id,
+                table.c.name,
+                table.c.meta_data,
+                table.c.content,
+                table.c.embedding,
+                table.c.usage,
+            )
+            .join(fused, fused.c.id == table.c.id)
+            .order_by(fused.c.score.desc())
+            .limit(limit)
+        )
+        if filters is not None:
+            # Metadata filters run on the fused candidates: inside the branches they'd stop HNSW from
+            # serving the vector scan on its own
+            stmt = stmt.where(table.c.meta_data.contains(filters))
+
+        try:
+            with self.Session() as sess, sess.begin():
+                # The vector branch must still be able to fill its LIMIT
+                self._configure_search(sess, limit, min_ef_search=branch_limit)
+                results = sess.execute(stmt).fetchall()
+        except Exception as e:
+            logger.error(f"Error performing RRF hybrid search: {e}")
+            return []
+
+        return self._to_documents(query, results)
+
+    def vector_search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Cosine search with the same per-query ef_search sizing and halfvec handling as hybrid_search"""
+        query_embedding = self.embedder.get_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Error getting embedding for Query: {query}")
+            return []
+
+        table = self.table
+        stmt = select(
+            table.c.id,
+            table.c.name,
+            table.c.meta_data,
+            table.c.content,
+            table.c.embedding,
+            table.c.usage,
+        )
+        if filters is not None:
+            stmt = stmt.where(table.c.meta_data.contains(filters))
+        stmt = stmt.order_by(self._cosine_distance(query_embedding)).limit(limit)
+
+        try:
+            with self.Session() as sess, sess.begin():
+                self._configure_search(sess, limit)
+                results = sess.execute(stmt).fetchall()
+        except Exception as e:
+            logger.error(f"Error performing vector search: {e}")
+            return []
+
+        return self._to_documents(query, results)
+
+    def _cosine_distance(self, query_embedding: List[float]):
+        if self.half_precision:
+            halfvec = HALFVEC(self.dimensions)
+            query_vector = cast(bindparam("query_embedding", query_embedding, type_=halfvec), halfvec)
+            return self.table.c.embedding.op("<=>", return_type=Float)(query_vector)
+        return self.table.c.embedding.cosine_distance(query_embedding)
+
+    def _configure_search(self, sess, limit: int, min_ef_search: int = 10) -> None:
+        """Size the index scan for this query's result count and set work_mem, for the current transaction only"""
+        if isinstance(self.vector_index, Ivfflat):
+            sess.execute(text(f"SET LOCAL ivfflat.probes = {self.vector_index.probes}"))
+        elif isinstance(self.vector_index, HNSW):
+            ef_search = max(10, HNSW_EF_SEARCH_MULT * limit, min_ef_search)
+            sess.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(ef_search)})
+        if WORK_MEM:
+            sess.execute(text("SELECT set_config('work_mem', :value, true)"), {"value": WORK_MEM})
+
+    def _to_documents(self, query: str, results) -> List[Document]:
+        documents = [
+            Document(
+                id=result.id,
+                name=result.name,
+                meta_data=result.meta_data,
+                content=result.content,
+                embedder=self.embedder,
+                embedding=result.embedding,
+                usage=result.usage,
+            )
+            for result in results
+        ]
+        if self.reranker:
+            documents = self.reranker.rerank(query=query, documents=documents)
+
+        log_debug(f"Found {len(documents)} documents")
+        return documents
+
+    def delete_stale(self, name: str, content_hash: str) -> int:
+        """Delete the rows of document `name` loaded from any other content_hash, i.e. earlier versions of it"""
+        stmt = delete(self.table).where(
+            self.table.c.name == name,
+            self.table.c.content_hash.is_distinct_from(content_hash),
+        )
+        with self.Session() as sess, sess.begin():
+            deleted = sess.execute(stmt).rowcount
+        log_debug(f"Deleted {deleted} stale rows of {name}")
+        return deleted
+
+    # Columns written by bulk_upsert, in COPY order
+    _COPY_COLUMNS = ("id", "name", "meta_data", "filters", "content", "embedding", "usage", "content_hash", "content_id")
+
+    def _copy_row(self, document: Document, content_hash: str, filters: Optional[Dict[str, Any]]) -> tuple:
+        content = document.content.replace("\x00", "\ufffd")
+        meta_data = {**(document.meta_data or {}), **(filters or {})}
+        return (
+            document.id or md5(content.encode()).hexdigest(),
+            document.name,
+            orjson.dumps(meta_data).decode(),
+            orjson.dumps(filters).decode() if filters else None,
+            content,
+            "[" + ",".join(map(str, document.embedding)) + "]",
+            orjson.dumps(document.usage).decode() if document.usage else None,
+            content_hash,
+            getattr(document, "content_id", None),
+        )
+
+    def bulk_upsert(self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Write already-embedded documents with one COPY into a temp table and one INSERT ... ON CONFLICT,
+        instead of a statement per row. Streams rows with psycopg (v3); psycopg2 gets the same COPY
+        as text-format input through copy_expert.
+        """
+        table = f'"{self.schema}"."{self.table_name}"'
+        columns = ", ".join(self._COPY_COLUMNS)
+        updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in self._COPY_COLUMNS if name != "id")
+        raw = self.db_engine.raw_connection()
+        try:
+            conn = raw.driver_connection
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE TEMP TABLE _bulk_vectors (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP")
+                copy_sql = f"COPY _bulk_vectors ({columns}) FROM STDIN"
+                if hasattr(cur, "copy"):
+                    with cur.copy(copy_sql) as copy:
+                        for document in documents:
+                            copy.write_row(self._copy_row(document, content_hash, filters))
+                else:
+                    rows = "".join(_copy_text_line(self._copy_row(document, content_hash, filters)) for document in documents)
+                    cur.copy_expert(copy_sql, io.StringIO(rows))
+                # DISTINCT ON: a repeated chunk in one load must not hit the same row twice
+                cur.execute(
+                    f"INSERT INTO {table} ({columns}) SELECT DISTINCT ON (id) {columns} FROM _bulk_vectors "
+                    f"ON CONFLICT (id) DO UPDATE SET {updates}"
+                )
+            conn.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    async def async_bulk_upsert(
+        self, content_hash: str, documents: List[Document], filters: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Embed the documents that have no vector yet in one batch call, then bulk_upsert them off the event loop"""
+        missing = [document for document in documents if not document.embedding]
+        if missing:
+            embeddings, usage = await self.embedder.async_get_embeddings_batch_and_usage(
+                [document.content for document in missing]
+            )
+            for document, embedding, document_usage in zip(missing, embeddings, usage):
+                document.embedding = embedding
+                document.usage = document_usage
+        embedded = [document for document in documents if document.embedding]
+        if len(embedded) < len(documents):
+            logger.warning(f"Skipping {len(documents) - len(embedded)} documents that could not be embedded")
+        await asyncio.to_thread(self.bulk_upsert, content_hash, embedded, filters)
@@ -3,35 +3,112 @@ FastAPI RAG Agent System
 Uses rag_agent.py as the main agent for policy queries with single vector search
 """
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List
-import json
-from app.agents.rag_agent import openai_rag_agent
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List
+import asyncio
+import os
+import orjson
+from time import perf_counter
+from agno.run.agent import RunEvent
+from agno.utils.log import logger
+from app.agents.rag_agent import get_knowledge_router, get_rag_agent, get_semantic_cache
+from app.clients import close_clients, get_embedder
+from app.utils import SelectiveGZipMiddleware, SingleFlight, coalesce_frames, single_flight_key, start_queue_logging, stop_queue_logging
+
+# "rag" serves the single RAG agent; "multi" serves the coordinator team (IRA + AA)
+AGENT_BACKEND = os.getenv("AGENT_BACKEND", "rag")
+if AGENT_BACKEND == "multi":
+    # Only the multi-agent deployment imports (and later builds) the team graph
+    from app.agents.coordinator_agent import get_coordinator_team, parse_team_response, run_multi_agent_query, stream_multi_agent_query
+    from app.agents.information_retrieval_agent import get_information_retrieval_agent
 
 app = FastAPI(
     title="Policy Assistant API",
     description="AI-powered assistant for company policies using RAG",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
+
+# Consecutive content frames are joined into one write within this window / size
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "10"))
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "4096"))
+
+# Comma-separated allow-list, e.g. "https://policies.example.com,http://localhost:3000"
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",") if origin.strip()]
+
+# Compress JSON responses; the SSE endpoint is excluded since gzip would buffer its frames
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    exclude_paths=("/agentic/query/streaming",),
+    minimum_size=1024,
+    compresslevel=5,
 )
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=CORS_ORIGINS,
+    # With "*" Starlette would reflect any Origin back on credentialed requests
+    allow_credentials="*" not in CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=600,  # Let browsers cache preflight results instead of re-sending OPTIONS per request
 )
 
 
+@app.on_event("startup")
+async def start_logging():
+    start_queue_logging()
+
+
+@app.on_event("startup")
+async def warm_up():
+    # Build the agent (and pay agno's import cost) before the first request arrives
+    await asyncio.to_thread(get_coordinator_team if AGENT_BACKEND == "multi" else get_rag_agent)
+
+
+def _policy_knowledge():
+    """The deployed backend's hybrid knowledge over the policy table; only that backend's graph is built"""
+    if AGENT_BACKEND == "multi":
+        return get_information_retrieval_agent().knowledge
+    return get_knowledge_router().hybrid_knowledge
+
+
+@app.on_event("startup")
+async def ensure_indexes():
+    # HNSW (vector_cosine_ops) + GIN full-text index; no-ops once they exist, run off the event loop
+    try:
+        await asyncio.to_thread(lambda: _policy_knowledge().vector_db.optimize())
+    except Exception as e:
+        logger.warning(f"Could not ensure policy vector indexes: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_clients()
+    stop_queue_logging()
+
+
+# Retries and double-submits of the same question in the same session share one agent run
+_single_flight = SingleFlight()
+
+
+# Immutable, closed schemas: unknown fields are rejected instead of carried along
+_SCHEMA_CONFIG = ConfigDict(frozen=True, extra="forbid")
+
+
 class QueryRequest(BaseModel):
+    model_config = _SCHEMA_CONFIG
+
     query: str
     session_id: str
 
 
 class AgentResponse(BaseModel):
+    model_config = _SCHEMA_CONFIG
+
     answer: str
     sources: List[str]
     tools_used: List[str]
@@ -50,20 +127,60 @@ async def root():
     }
 
 
+def _uses_memory(tool_names: List[str]) -> bool:
+    """Runs that read or wrote user memories may be personalized and must not be served to other sessions"""
+    return any('memor' in tool_name for tool_name in tool_names)
+
+
+def _session_has_runs(session_id: str) -> bool:
+    """True when the agent will put earlier runs of this session (history, extracted memories) into context"""
+    session = get_rag_agent().get_session(session_id=session_id)
+    return bool(session is not None and session.runs)
+
+
+def _cacheable(answer: str, called_tools: List[str], had_history: bool) -> bool:
+    """
+    Whether a rag answer may be stored in the semantic cache.
+
+    Entries are scoped to the session, and only answers produced without prior session context
+    (history or memories) or memory tools are stored, so a replay never depends on context it skips.
+    """
+    return bool(answer) and not had_history and not _uses_memory(called_tools)
+
+
 @app.post("/agentic/query", response_model=AgentResponse)
 async def query_agent(request: QueryRequest):
     """
     Process employee queries about company policies using RAG agent.
     """
     try:
-        # Run RAG agent
-        response = openai_rag_agent.run(
-            input=request.query,
-            session_id=request.session_id,
-            stream=False,
+        if AGENT_BACKEND == "multi":
+            # The team path does its own semantic caching
+            result = await _single_flight.do(
+                single_flight_key("query", request.session_id, request.query),
+                lambda: run_multi_agent_query(request.query, request.session_id),
+            )
+            return AgentResponse(**result)
+        
+        # Paraphrases of a question this session already asked skip the agent entirely
+        query_embedding = await get_embedder().async_get_embedding(request.query)
+        cached_response = await asyncio.to_thread(get_semantic_cache().lookup, query_embedding, request.session_id)
+        if cached_response is not None:
+            return AgentResponse(**cached_response)
+        had_history = await asyncio.to_thread(_session_has_runs, request.session_id)
+        
+        # Run RAG agent; arun extracts user memories concurrently with the main response
+        response = await _single_flight.do(
+            single_flight_key("query", request.session_id, request.query),
+            lambda: get_rag_agent().arun(
+                input=request.query,
+                session_id=request.session_id,
+                stream=False,
+            ),
         )
         
-        answer = response.content if hasattr(response, 'content') else str(response)
+        # arun(stream=False) always returns a RunOutput
+        answer = response.content
         
         # Default metadata
         sources = ["Organization Policies & Processes Manual"]
@@ -74,13 +191,21 @@ async def query_agent(request: QueryRequest):
             "Generated comprehensive response"
         ]
         
-        return AgentResponse(
+        result = AgentResponse(
             answer=answer,
             sources=sources,
             tools_used=tools_used,
             reasoning_steps=reasoning_steps
         )
         
+        called_tools = [tool.tool_name for tool in (getattr(response, 'tools', None) or []) if tool.tool_name]
+        if _cacheable(answer, called_tools, had_history):
+            await asyncio.to_thread(
+                get_semantic_cache().store, request.query, query_embedding, result.model_dump(), request.session_id
+            )
+        
+        return result
+        
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -88,6 +213,138 @@ async def query_agent(request: QueryRequest):
         )
 
 
+def _sse(payload: Dict[str, Any]) -> bytes:
+    """Encode one server-sent event frame"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+
+# Content frames are the per-token hot path: only the chunk string itself is serialized
+_CONTENT_PREFIX = b'data: {"type":"content","chunk":'
+_FRAME_SUFFIX = b'}\n\n'
+
+
+def _sse_content(chunk: str) -> bytes:
+    return _CONTENT_PREFIX + orjson.dumps(chunk) + _FRAME_SUFFIX
+
+
+def _is_content_frame(frame: bytes) -> bool:
+    return frame.startswith(_CONTENT_PREFIX)
+
+
+# Frames that never change between requests, encoded once at import
+_SSE_ANALYZING = _sse({'type': 'thinking', 'message': 'RAG Agent analyzing query...'})
+_SSE_RECEIVED = _sse({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'Received query and searching knowledge base', 'status': 'in_progress'})
+_SSE_SEARCHING = _sse({'type': 'thinking', 'message': 'Searching policy documents...'})
+_SSE_NO_DOCS = _sse({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'No relevant policy documents found', 'status': 'completed', 'response': 'Proceeding with general knowledge'})
+_SSE_GENERATING = _sse({'type': 'thinking', 'message': 'Generating response...'})
+_SSE_GENERATION_STEP = _sse({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'Analyzing content and generating response', 'status': 'in_progress'})
+_SSE_GENERATION_DONE = _sse({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'Response generation complete', 'status': 'completed', 'response': 'Successfully generated policy response'})
+
+
+_STREAM_END = object()
+
+
+async def _pump_agent_stream(request: QueryRequest, agent_chunks: asyncio.Queue) -> None:
+    """Feed the agent's streamed events into a queue, ending with _STREAM_END even on failure"""
+    try:
+        async for chunk in get_rag_agent().arun(
+            input=request.query,
+            session_id=request.session_id,
+            stream=True,
+            stream_intermediate_steps=True,
+        ):
+            await agent_chunks.put(chunk)
+    finally:
+        await agent_chunks.put(_STREAM_END)
+
+
+async def _pump_team_stream(request: QueryRequest, team_batches: asyncio.Queue) -> None:
+    """Feed the team's batched content deltas into a queue, ending with _STREAM_END even on failure"""
+    try:
+        async for batch in stream_multi_agent_query(request.query, request.session_id):
+            await team_batches.put(batch)
+    finally:
+        await team_batches.put(_STREAM_END)
+
+
+def _source_name(doc) -> str:
+    meta = doc.meta_data or {}
+    return meta.get('source') or meta.get('name') or meta.get('filename') or 'Organization Policy'
+
+
+def _source_names(documents) -> List[str]:
+    """Order-preserving dedup keeps source order stable across identical requests"""
+    return list(dict.fromkeys(_source_name(doc) for doc in documents))
+
+
+_TEAM_AGENT = 'Policy Analysis Team'
+_SSE_TEAM_ANALYZING = _sse({'type': 'thinking', 'message': 'Coordinator routing query to agents...'})
+_SSE_TEAM_RECEIVED = _sse({'type': 'agent_step', 'agent': _TEAM_AGENT, 'step': 'Received query and searching knowledge base', 'status': 'in_progress'})
+_SSE_TEAM_NO_DOCS = _sse({'type': 'agent_step', 'agent': _TEAM_AGENT, 'step': 'No relevant policy documents found', 'status': 'completed', 'response': 'Proceeding with general knowledge'})
+_SSE_TEAM_GENERATION_STEP = _sse({'type': 'agent_step', 'agent': _TEAM_AGENT, 'step': 'Analyzing content and generating response', 'status': 'in_progress'})
+_SSE_TEAM_GENERATION_DONE = _sse({'type': 'agent_step', 'agent': _TEAM_AGENT, 'step': 'Response generation complete', 'status': 'completed', 'response': 'Successfully generated policy response'})
+
+
+async def _multi_agent_event_generator(request: QueryRequest):
+    """SSE frames for the coordinator team, in the same sequence and frame types as the RAG agent's stream"""
+    team_task = None
+    try:
+        t0 = perf_counter()
+        yield _SSE_TEAM_ANALYZING
+        yield _SSE_TEAM_RECEIVED
+        yield _SSE_SEARCHING
+        
+        # The team starts now; its deltas queue while the source lookup (shared with the IRA's cached search) runs
+        team_batches: asyncio.Queue = asyncio.Queue()
+        t_generate = perf_counter()
+        team_task = asyncio.create_task(_pump_team_stream(request, team_batches))
+        
+        search_results = await _policy_knowledge().async_search(request.query)
+        if search_results:
+            for source in _source_names(search_results):
+                yield _sse({'type': 'source', 'source': source})
+            yield _sse({'type': 'agent_step', 'agent': _TEAM_AGENT, 'step': 'Retrieved relevant policy sections', 'status': 'completed', 'response': f"Found {len(search_results)} policy sections"})
+        else:
+            yield _SSE_TEAM_NO_DOCS
+        
+        yield _SSE_GENERATING
+        yield _SSE_TEAM_GENERATION_STEP
+        
+        response_chunks = []
+        t_first_token_ms = None
+        while (batch := await team_batches.get()) is not _STREAM_END:
+            content = "".join(batch)
+            if t_first_token_ms is None:
+                t_first_token_ms = (perf_counter() - t_generate) * 1000
+            response_chunks.append(content)
+            yield _sse_content(content)
+        
+        # Surface any error raised inside the team run
+        await team_task
+        response_text = "".join(response_chunks)
+        yield _SSE_TEAM_GENERATION_DONE
+        
+        result = parse_team_response(response_text)
+        timings = {
+            't_first_token_ms': round(t_first_token_ms, 1) if t_first_token_ms is not None else None,
+            't_generate_ms': round((perf_counter() - t_generate) * 1000, 1),
+            't_total_ms': round((perf_counter() - t0) * 1000, 1),
+        }
+        yield _sse({
+            'type': 'metadata',
+            'reasoning_steps': result['reasoning_steps'],
+            'sources': result['sources'],
+            'tools_used': result['tools_used'],
+            'timings': timings,
+        })
+        yield _sse({'type': 'done', 'full_response': response_text})
+    except Exception as e:
+        yield _sse({'type': 'error', 'message': str(e)})
+    finally:
+        if team_task is not None and not team_task.done():
+            team_task.cancel()
+
+
 @app.post("/agentic/query/streaming")
 async def query_agent_streaming(request: QueryRequest):
     """
@@ -95,73 +352,154 @@ async def query_agent_streaming(request: QueryRequest):
     Uses single vector search from rag_agent.py knowledge base.
     """
     async def event_generator():
+        agent_task = None
         try:
+            t0 = perf_counter()
+            
             # Step 1: RAG Agent receives query
-            yield f"data: {json.dumps({'type': 'thinking', 'message': 'RAG Agent analyzing query...'})}\n\n"
-            yield f"data: {json.dumps({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'Received query and searching knowledge base', 'status': 'in_progress'})}\n\n"
+            yield _SSE_ANALYZING
+            yield _SSE_RECEIVED
+            
+            # Paraphrases of a question this session already asked are replayed from the semantic cache
+            query_embedding = await get_embedder().async_get_embedding(request.query)
+            cached_response = await asyncio.to_thread(get_semantic_cache().lookup, query_embedding, request.session_id)
+            if cached_response is not None:
+                for source in cached_response['sources']:
+                    yield _sse({'type': 'source', 'source': source})
+                yield _sse_content(cached_response['answer'])
+                yield _SSE_GENERATION_DONE
+                yield _sse({
+                    'type': 'metadata',
+                    'reasoning_steps': cached_response['reasoning_steps'],
+                    'sources': cached_response['sources'],
+                    'tools_used': cached_response['tools_used'],
+                    'timings': {'t_total_ms': round((perf_counter() - t0) * 1000, 1), 'cached': True},
+                })
+                yield _sse({'type': 'done', 'full_response': cached_response['answer']})
+                return
             
             # Step 2: Search knowledge base (SINGLE search using rag_agent's knowledge)
-            yield f"data: {json.dumps({'type': 'thinking', 'message': 'Searching policy documents...'})}\n\n"
+            yield _SSE_SEARCHING
+            
+            # Checked before the run, which adds itself to the session
+            had_history = await asyncio.to_thread(_session_has_runs, request.session_id)
+            
+            # Start the agent now so its setup and own retrieval overlap with the source lookup below.
+            # Both are async searches (the agent's retriever is KnowledgeRouter.aretrieve), so they coalesce
+            # into one in CachedKnowledge without either blocking the loop. Tokens queue until sources are sent.
+            agent_chunks: asyncio.Queue = asyncio.Queue()
+            t_generate = perf_counter()
+            agent_task = asyncio.create_task(_pump_agent_stream(request, agent_chunks))
             
-            search_results = openai_rag_agent.knowledge.search(request.query)
+            knowledge_router = get_knowledge_router()
+            t_search = perf_counter()
+            search_results = await knowledge_router.async_search(request.query)
+            t_embed_search_ms = (perf_counter() - t_search) * 1000
             total_chunks = len(search_results)
             found_docs = total_chunks > 0
             
-            sources = []
             if found_docs:
-                for doc in search_results:
-                    meta = getattr(doc, 'metadata', {}) or {}
-                    source_name = meta.get('source') or meta.get('name') or meta.get('filename') or 'Organization Policy'
-                    sources.append(source_name)
-                
-                unique_sources = list(set(sources))
+                unique_sources = _source_names(search_results)
                 for source in unique_sources:
-                    yield f"data: {json.dumps({'type': 'source', 'source': source})}\n\n"
+                    yield _sse({'type': 'source', 'source': source})
                 
                 ira_msg = f"Found {total_chunks} policy sections"
-                yield f"data: {json.dumps({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'Retrieved relevant policy sections', 'status': 'completed', 'response': ira_msg})}\n\n"
+                yield _sse({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'Retrieved relevant policy sections', 'status': 'completed', 'response': ira_msg})
             else:
-                yield f"data: {json.dumps({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'No relevant policy documents found', 'status': 'completed', 'response': 'Proceeding with general knowledge'})}\n\n"
+                yield _SSE_NO_DOCS
             
             # Step 3: Generate response with streaming
-            yield f"data: {json.dumps({'type': 'thinking', 'message': 'Generating response...'})}\n\n"
-            yield f"data: {json.dumps({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'Analyzing content and generating response', 'status': 'in_progress'})}\n\n"
+            yield _SSE_GENERATING
+            yield _SSE_GENERATION_STEP
             
-            response_text = ""
+            response_chunks = []
+            called_tools = []
+            t_first_token_ms = None
             
-            # Stream from RAG agent
-            for chunk in openai_rag_agent.run(
-                input=request.query,
-                session_id=request.session_id,
-                stream=True,
-            ):
-                if hasattr(chunk, 'content') and chunk.content:
+            # Drain the RAG agent stream; tool events carry the metadata so the run never has to be repeated for it
+            while True:
+                chunk = await agent_chunks.get()
+                if chunk is _STREAM_END:
+                    break
+                event = getattr(chunk, 'event', None)
+                if event == RunEvent.tool_call_completed:
+                    tool = getattr(chunk, 'tool', None)
+                    if tool is not None and tool.tool_name:
+                        called_tools.append(tool.tool_name)
+                elif event == RunEvent.run_content and chunk.content:
                     content = chunk.content
-                    response_text += content
-                    yield f"data: {json.dumps({'type': 'content', 'chunk': content})}\n\n"
+                    if t_first_token_ms is None:
+                        t_first_token_ms = (perf_counter() - t_generate) * 1000
+                    response_chunks.append(content)
+                    yield _sse_content(content)
+            
+            # Surface any error raised inside the agent run
+            await agent_task
+            t_generate_ms = (perf_counter() - t_generate) * 1000
             
             # Step 4: RAG Agent completed
-            yield f"data: {json.dumps({'type': 'agent_step', 'agent': 'RAG Agent', 'step': 'Response generation complete', 'status': 'completed', 'response': 'Successfully generated policy response'})}\n\n"
+            yield _SSE_GENERATION_DONE
             
             # Send final metadata
             reasoning_steps = [
                 "Searched knowledge base for relevant policies",
                 "Retrieved and analyzed policy documents",
+                *(f"Used {tool_name}" for tool_name in called_tools),
                 "Generated comprehensive response"
             ]
             tools_used = ['knowledge_search', 'reasoning']
+            for tool_name in called_tools:
+                if tool_name not in tools_used:
+                    tools_used.append(tool_name)
             final_sources = unique_sources if found_docs else ["Organization Policies & Processes Manual"]
             
-            yield f"data: {json.dumps({'type': 'metadata', 'reasoning_steps': reasoning_steps, 'sources': final_sources, 'tools_used': tools_used})}\n\n"
+            timings = {
+                't_embed_search_ms': round(t_embed_search_ms, 1),
+                't_first_token_ms': round(t_first_token_ms, 1) if t_first_token_ms is not None else None,
+                't_generate_ms': round(t_generate_ms, 1),
+                't_total_ms': round((perf_counter() - t0) * 1000, 1),
+            }
+            logger.info(
+                f"[SSE] session_id={request.session_id} retrieval_path={knowledge_router.retrieval_path(request.query)} "
+                f"chunks={total_chunks} tools={len(called_tools)} timings={timings}"
+            )
+            
+            yield _sse({'type': 'metadata', 'reasoning_steps': reasoning_steps, 'sources': final_sources, 'tools_used': tools_used, 'timings': timings})
+            
+            # Assemble the full response once instead of concatenating per chunk
+            response_text = "".join(response_chunks)
             
             # Send completion event
-            yield f"data: {json.dumps({'type': 'done', 'full_response': response_text})}\n\n"
+            yield _sse({'type': 'done', 'full_response': response_text})
+            
+            if _cacheable(response_text, called_tools, had_history):
+                await asyncio.to_thread(
+                    get_semantic_cache().store,
+                    request.query,
+                    query_embedding,
+                    {'answer': response_text, 'sources': final_sources, 'tools_used': tools_used, 'reasoning_steps': reasoning_steps},
+                    request.session_id,
+                )
             
         except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            yield _sse({'type': 'error', 'message': str(e)})
+        finally:
+            if agent_task is not None and not agent_task.done():
+                agent_task.cancel()
+    
+    if AGENT_BACKEND == "multi":
+        factory = lambda: _multi_agent_event_generator(request)
+    else:
+        factory = event_generator
+    frames = _single_flight.stream(single_flight_key("streaming", request.session_id, request.query), factory)
     
     return StreamingResponse(
-        event_generator(),
+        coalesce_frames(
+            frames,
+            is_batchable=_is_content_frame,
+            max_bytes=SSE_COALESCE_BYTES,
+            max_delay_ms=SSE_COALESCE_MS,
+        ),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -179,4 +517,4 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, workers=int(os.getenv("API_WORKERS", "1")))
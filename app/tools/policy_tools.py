@@ -1,10 +1,76 @@
 """
 Simple tools for policy analysis
 """
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
 from agno.tools.toolkit import Toolkit
 from agno.utils.log import logger
 
 
+@dataclass(frozen=True, slots=True)
+class RoleRule:
+    can_request: Tuple[str, ...]
+    can_approve: Tuple[str, ...]
+    approval_limit: int
+    requires_approval_from: Tuple[str, ...]
+
+    def as_view(self) -> Dict[str, Any]:
+        """JSON-ready dict of this rule; a fresh copy per call, so callers can't mutate the shared rule"""
+        return {
+            "can_request": list(self.can_request),
+            "can_approve": list(self.can_approve),
+            "approval_limit": self.approval_limit,
+            "requires_approval_from": list(self.requires_approval_from),
+        }
+
+
+# Role rules are static, so they are built once at import instead of on every role_lookup call
+_ROLE_RULES: Mapping[str, RoleRule] = MappingProxyType({
+    "employee": RoleRule(
+        can_request=("hardware", "software", "leave", "training"),
+        can_approve=(),
+        approval_limit=0,
+        requires_approval_from=("manager",),
+    ),
+    "manager": RoleRule(
+        can_request=("hardware", "software", "leave", "training", "budget"),
+        can_approve=("hardware", "software", "leave", "training"),
+        approval_limit=5000,
+        requires_approval_from=("director",),
+    ),
+    "director": RoleRule(
+        can_request=("hardware", "software", "leave", "training", "budget", "hiring"),
+        can_approve=("hardware", "software", "leave", "training", "budget"),
+        approval_limit=25000,
+        requires_approval_from=("ceo",),
+    ),
+    "hr": RoleRule(
+        can_request=("hardware", "software", "leave", "training"),
+        can_approve=("leave", "training", "onboarding"),
+        approval_limit=10000,
+        requires_approval_from=("director",),
+    ),
+    "ceo": RoleRule(
+        can_request=("all",),
+        can_approve=("all",),
+        approval_limit=100000,
+        requires_approval_from=(),
+    ),
+})
+
+_AVAILABLE_ROLES = tuple(_ROLE_RULES)
+
+
+@lru_cache(maxsize=128)
+def _keyword_pattern(keyword: str) -> "re.Pattern[str]":
+    """Case-insensitive literal matcher, compiled once per keyword"""
+    return re.compile(re.escape(keyword), re.IGNORECASE)
+
+
 class PolicyTools(Toolkit):
     def __init__(self):
         super().__init__(name="policy_tools")
@@ -22,21 +88,38 @@ class PolicyTools(Toolkit):
         Returns:
             Dictionary with count and details
         """
-        lines = text.lower().split('\n')
+        pattern = _keyword_pattern(keyword)
         count = 0
         matching_lines = []
         
-        for i, line in enumerate(lines, 1):
-            if keyword.lower() in line:
-                count += 1
-                matching_lines.append(f"Line {i}: {line.strip()}")
+        # One regex pass over the original text: after each hit, jump to the next line so a line counts once
+        text_length = len(text)
+        line_number = 1
+        counted_to = 0
+        pos = 0
+        while pos <= text_length:
+            match = pattern.search(text, pos)
+            if match is None:
+                break
+            start = match.start()
+            line_number += text.count('\n', counted_to, start)
+            counted_to = start
+            line_end = text.find('\n', start)
+            if line_end == -1:
+                line_end = text_length
+            
+            count += 1
+            if len(matching_lines) < 5:
+                line_start = text.rfind('\n', 0, start) + 1
+                matching_lines.append(f"Line {line_number}: {text[line_start:line_end].strip().lower()}")
+            pos = line_end + 1
         
         logger.info(f"Counted {count} occurrences of '{keyword}'")
         
         return {
             "keyword": keyword,
             "count": count,
-            "matching_lines": matching_lines[:5]
+            "matching_lines": matching_lines
         }
     
     def role_lookup(self, role: str) -> dict:
@@ -49,52 +132,19 @@ class PolicyTools(Toolkit):
         Returns:
             Dictionary with role permissions and approval limits
         """
-        role_rules = {
-            "employee": {
-                "can_request": ["hardware", "software", "leave", "training"],
-                "can_approve": [],
-                "approval_limit": 0,
-                "requires_approval_from": ["manager"]
-            },
-            "manager": {
-                "can_request": ["hardware", "software", "leave", "training", "budget"],
-                "can_approve": ["hardware", "software", "leave", "training"],
-                "approval_limit": 5000,
-                "requires_approval_from": ["director"]
-            },
-            "director": {
-                "can_request": ["hardware", "software", "leave", "training", "budget", "hiring"],
-                "can_approve": ["hardware", "software", "leave", "training", "budget"],
-                "approval_limit": 25000,
-                "requires_approval_from": ["ceo"]
-            },
-            "hr": {
-                "can_request": ["hardware", "software", "leave", "training"],
-                "can_approve": ["leave", "training", "onboarding"],
-                "approval_limit": 10000,
-                "requires_approval_from": ["director"]
-            },
-            "ceo": {
-                "can_request": ["all"],
-                "can_approve": ["all"],
-                "approval_limit": 100000,
-                "requires_approval_from": []
-            }
-        }
-        
-        role_lower = role.lower()
-        if role_lower in role_rules:
+        rule = _ROLE_RULES.get(role.lower())
+        if rule is not None:
             logger.info(f"Retrieved role rules for: {role}")
             return {
                 "role": role,
                 "found": True,
-                "rules": role_rules[role_lower]
+                "rules": rule.as_view()
             }
         else:
             return {
                 "role": role,
                 "found": False,
                 "error": f"Role '{role}' not found in system",
-                "available_roles": list(role_rules.keys())
+                "available_roles": list(_AVAILABLE_ROLES)
             }
 
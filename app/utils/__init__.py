@@ -0,0 +1,16 @@
+from .log import start_queue_logging, stop_queue_logging
+from .middleware import SelectiveGZipMiddleware
+from .rate_limit import TokenBucketRateLimiter
+from .singleflight import SingleFlight, single_flight_key
+from .streaming import batch_chunks, coalesce_frames
+
+__all__ = [
+    "SelectiveGZipMiddleware",
+    "SingleFlight",
+    "TokenBucketRateLimiter",
+    "batch_chunks",
+    "coalesce_frames",
+    "single_flight_key",
+    "start_queue_logging",
+    "stop_queue_logging",
+]
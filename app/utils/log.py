@@ -0,0 +1,33 @@
+"""
+Non-blocking logging
+Handlers (console, files, log shippers) run on background threads instead of the event loop
+"""
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterable, List
+
+_listeners: List[QueueListener] = []
+
+
+def start_queue_logging(logger_names: Iterable[str] = ("", "agno", "uvicorn", "uvicorn.access", "uvicorn.error")) -> None:
+    """Swap each logger's handlers for a QueueHandler drained by a background QueueListener"""
+    if _listeners:
+        return
+
+    for name in logger_names:
+        target = logging.getLogger(name)
+        if not target.handlers:
+            continue
+        # One queue per logger so records still only reach that logger's own handlers
+        log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        listener = QueueListener(log_queue, *target.handlers, respect_handler_level=True)
+        target.handlers = [QueueHandler(log_queue)]
+        listener.start()
+        _listeners.append(listener)
+
+
+def stop_queue_logging() -> None:
+    """Flush pending records and stop the background listeners"""
+    while _listeners:
+        _listeners.pop().stop()
@@ -0,0 +1,22 @@
+"""
+HTTP middleware
+"""
+from typing import Iterable
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SelectiveGZipMiddleware:
+    """GZip responses except on excluded paths (SSE streams must flush each frame uncompressed)"""
+
+    def __init__(self, app: ASGIApp, exclude_paths: Iterable[str] = (), minimum_size: int = 1024, compresslevel: int = 5):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
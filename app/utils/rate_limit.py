@@ -0,0 +1,76 @@
+"""
+Rate limiting
+Token-bucket throttling against an LLM provider's requests/tokens-per-minute budget
+"""
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucketRateLimiter:
+    """
+    Async limiter whose request and token capacity refill continuously up to the per-minute limits.
+
+    Mirrors the capacity accounting of the OpenAI cookbook's parallel request processor.
+    A limit of None disables that dimension.
+    """
+
+    def __init__(
+        self,
+        max_requests_per_minute: Optional[float] = None,
+        max_tokens_per_minute: Optional[float] = None,
+    ):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self._request_capacity = max_requests_per_minute or 0.0
+        self._token_capacity = max_tokens_per_minute or 0.0
+        self._last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_requests_per_minute or self.max_tokens_per_minute)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_update
+        self._last_update = now
+        if self.max_requests_per_minute:
+            self._request_capacity = min(
+                self.max_requests_per_minute,
+                self._request_capacity + self.max_requests_per_minute * elapsed / 60,
+            )
+        if self.max_tokens_per_minute:
+            self._token_capacity = min(
+                self.max_tokens_per_minute,
+                self._token_capacity + self.max_tokens_per_minute * elapsed / 60,
+            )
+
+    async def acquire(self, requests: int = 1, tokens: int = 0) -> None:
+        """Wait until `requests` requests and `tokens` tokens fit in the budget, then consume them"""
+        if not self.enabled:
+            return
+
+        requests = min(requests, self.max_requests_per_minute or requests)
+        tokens = min(tokens, self.max_tokens_per_minute or tokens)
+
+        # Holding the lock while sleeping keeps waiters in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                missing_requests = requests - self._request_capacity if self.max_requests_per_minute else 0
+                missing_tokens = tokens - self._token_capacity if self.max_tokens_per_minute else 0
+                if missing_requests <= 0 and missing_tokens <= 0:
+                    break
+
+                wait = 0.0
+                if missing_requests > 0:
+                    wait = max(wait, missing_requests * 60 / self.max_requests_per_minute)
+                if missing_tokens > 0:
+                    wait = max(wait, missing_tokens * 60 / self.max_tokens_per_minute)
+                await asyncio.sleep(wait)
+
+            if self.max_requests_per_minute:
+                self._request_capacity -= requests
+            if self.max_tokens_per_minute:
+                self._token_capacity -= tokens
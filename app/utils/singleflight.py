@@ -0,0 +1,81 @@
+"""
+Single-flight request coalescing
+Concurrent callers with the same key share one in-flight computation (or one stream)
+"""
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def single_flight_key(*parts: str) -> str:
+    """Stable short key for a tuple of strings"""
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=16).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("items", "done", "error", "condition")
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.condition = asyncio.Condition()
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent work by key.
+
+    The shared work runs in its own task, so a caller disconnecting doesn't cancel it for
+    the others. Keys are dropped as soon as the work finishes: this is coalescing, not caching.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Task[Any]"] = {}
+        self._streams: Dict[str, _Flight] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Replay everything produced so far to late joiners, then follow the live stream"""
+        flight = self._streams.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._streams[key] = flight
+            asyncio.ensure_future(self._pump(key, flight, factory()))
+
+        index = 0
+        while True:
+            async with flight.condition:
+                await flight.condition.wait_for(lambda: len(flight.items) > index or flight.done)
+                items = flight.items[index:]
+                done = flight.done
+            for item in items:
+                yield item
+            index += len(items)
+            if done and index >= len(flight.items):
+                if flight.error is not None:
+                    raise flight.error
+                return
+
+    async def _pump(self, key: str, flight: _Flight, source: AsyncIterator[T]) -> None:
+        try:
+            async for item in source:
+                async with flight.condition:
+                    flight.items.append(item)
+                    flight.condition.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            self._streams.pop(key, None)
+            async with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
@@ -0,0 +1,132 @@
+"""
+Streaming helpers
+Coalesce fine-grained async streams so callers handle fewer, larger items
+"""
+import asyncio
+from typing import AsyncIterator, Callable, List, TypeVar
+
+T = TypeVar("T")
+
+_END = object()
+
+
+async def batch_chunks(
+    source: AsyncIterator[T],
+    max_interval_ms: float = 200,
+    max_chunks: int = 16,
+) -> AsyncIterator[List[T]]:
+    """
+    Group items from `source` into lists.
+
+    A batch is yielded when it holds `max_chunks` items or when `max_interval_ms`
+    has passed since its first item arrived, whichever comes first.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    # Read the source in its own task so a flush timeout never cancels the source mid-item
+    async def pump() -> None:
+        try:
+            async for item in source:
+                await queue.put(item)
+        finally:
+            await queue.put(_END)
+
+    pump_task = asyncio.create_task(pump())
+    loop = asyncio.get_running_loop()
+    batch: List[T] = []
+    deadline = None
+
+    try:
+        while True:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield batch
+                batch, deadline = [], None
+                continue
+
+            if item is _END:
+                break
+
+            batch.append(item)
+            if deadline is None:
+                deadline = loop.time() + max_interval_ms / 1000
+            if len(batch) >= max_chunks:
+                yield batch
+                batch, deadline = [], None
+
+        if batch:
+            yield batch
+
+        # Surface any error raised by the source
+        await pump_task
+    finally:
+        if not pump_task.done():
+            pump_task.cancel()
+
+
+async def coalesce_frames(
+    source: AsyncIterator[bytes],
+    is_batchable: Callable[[bytes], bool],
+    max_bytes: int = 4096,
+    max_delay_ms: float = 10,
+) -> AsyncIterator[bytes]:
+    """
+    Concatenate consecutive batchable frames from `source` into one write.
+
+    Buffered frames are flushed after `max_delay_ms`, once `max_bytes` are buffered, or
+    right before any non-batchable frame, which is always passed through immediately.
+    Frames are only joined, never split, so SSE event boundaries are preserved.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for frame in source:
+                await queue.put(frame)
+        finally:
+            await queue.put(_END)
+
+    pump_task = asyncio.create_task(pump())
+    loop = asyncio.get_running_loop()
+    buffer: List[bytes] = []
+    buffered = 0
+    deadline = None
+
+    try:
+        while True:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                frame = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield b"".join(buffer)
+                buffer, buffered, deadline = [], 0, None
+                continue
+
+            if frame is _END:
+                break
+
+            if not is_batchable(frame):
+                if buffer:
+                    yield b"".join(buffer)
+                    buffer, buffered, deadline = [], 0, None
+                yield frame
+                continue
+
+            buffer.append(frame)
+            buffered += len(frame)
+            if deadline is None:
+                deadline = loop.time() + max_delay_ms / 1000
+            if buffered >= max_bytes:
+                yield b"".join(buffer)
+                buffer, buffered, deadline = [], 0, None
+
+        if buffer:
+            yield b"".join(buffer)
+
+        # Surface any error raised by the source
+        await pump_task
+    finally:
+        if not pump_task.done():
+            pump_task.cancel()
@@ -1,13 +1,22 @@
 """
 Run the FastAPI Multi-Agent System
 """
+import os
+
 import uvicorn
 
+# Worker processes; each builds its own agent and connection pools lazily. Session state lives in
+# Postgres, so requests from one client can land on any worker.
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# Auto-reload is a development convenience and only works with a single worker
+API_RELOAD = os.getenv("API_RELOAD", "true").lower() == "true" and API_WORKERS == 1
+
 if __name__ == "__main__":
+    # loop/http stay on "auto": uvloop and httptools are used whenever uvicorn[standard] is installed
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=API_RELOAD,
+        workers=API_WORKERS,
     )
-
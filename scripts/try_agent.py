@@ -0,0 +1,19 @@
+"""
+Try the RAG agent from the command line
+Usage: python scripts/try_agent.py "Tell me about Sales Approval Policy"
+"""
+import sys
+from pathlib import Path
+
+# Make the app package importable when run from the scripts directory
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.agents.rag_agent import get_rag_agent
+
+if __name__ == "__main__":
+    query = sys.argv[1] if len(sys.argv) > 1 else "Tell me about Sales Approval Policy"
+    get_rag_agent().print_response(
+        query,
+        stream=True,
+    )
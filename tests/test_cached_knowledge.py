@@ -0,0 +1,90 @@
+"""
+Search coalescing in CachedKnowledge, and the SSE handler / agent retriever pair that relies on it
+"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("agno")
+pytest.importorskip("cachetools")
+
+from agno.knowledge.document import Document  # noqa: E402
+
+from app.knowledge import CachedKnowledge, KnowledgeRouter  # noqa: E402
+
+
+class FakeVectorDb:
+    """Counts searches; async searches take long enough for a second caller to arrive mid-flight"""
+
+    embedder = None
+
+    def __init__(self):
+        self.sync_calls = 0
+        self.async_calls = 0
+
+    def exists(self):
+        return True
+
+    def search(self, query, limit=5, filters=None):
+        self.sync_calls += 1
+        time.sleep(0.01)
+        return [Document(name="manual", content=f"sync result for {query}")]
+
+    async def async_search(self, query, limit=5, filters=None):
+        self.async_calls += 1
+        await asyncio.sleep(0.05)
+        return [Document(name="manual", content=f"async result for {query}")]
+
+
+@pytest.fixture
+def vector_db():
+    return FakeVectorDb()
+
+
+def test_sync_search_on_the_loop_does_not_wait_for_an_async_leader(vector_db):
+    knowledge = CachedKnowledge(vector_db=vector_db, max_results=3)
+
+    async def main():
+        leader = asyncio.create_task(knowledge.async_search("leave policy"))
+        await asyncio.sleep(0)
+        # Blocking on the leader here would deadlock: it can only finish on this thread
+        sync_documents = knowledge.search("leave policy")
+        return sync_documents, await leader
+
+    sync_documents, async_documents = asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+    assert sync_documents[0].content == "sync result for leave policy"
+    assert async_documents[0].content == "async result for leave policy"
+
+
+def test_handler_lookup_and_agent_retriever_share_one_search(vector_db):
+    knowledge = CachedKnowledge(vector_db=vector_db, max_results=3)
+    router = KnowledgeRouter(knowledge, knowledge, max_results=3)
+    query = "How many days of annual leave do new employees get each year?"
+
+    async def main():
+        # What the SSE handler runs while the agent task reaches its knowledge retriever
+        return await asyncio.gather(router.async_search(query), router.aretrieve(query))
+
+    documents, references = asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+    assert vector_db.async_calls == 1 and vector_db.sync_calls == 0
+    assert [document.content for document in documents] == [reference["content"] for reference in references]
+
+
+def test_cancelled_leader_hands_the_search_to_a_follower(vector_db):
+    knowledge = CachedKnowledge(vector_db=vector_db, max_results=3)
+
+    async def main():
+        leader = asyncio.create_task(knowledge.async_search("expense limits"))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(knowledge.async_search("expense limits"))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    documents = asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+    assert documents[0].content == "async result for expense limits"
+    assert vector_db.async_calls == 2
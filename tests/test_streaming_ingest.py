@@ -0,0 +1,46 @@
+"""
+Section splitting of the streamed ingest, and how it composes with MarkdownHeaderChunking
+"""
+import pytest
+
+pytest.importorskip("agno")
+
+from vectorizer.markdown_header_chunking import MarkdownHeaderChunking  # noqa: E402
+from vectorizer.streaming_ingest import iter_markdown_sections, iter_section_chunks  # noqa: E402
+
+MANUAL = (
+    "# Policies Manual\n\nIntro paragraph.\n\n"
+    "## Leave\n\nLeave policy.\n\n### Sick leave\n\nSick leave rules.\n\n"
+    "## Hardware\n\nHardware policy.\n\n### Approval\n\nApproval steps.\n"
+)
+
+
+@pytest.fixture
+def manual(tmp_path):
+    path = tmp_path / "manual.md"
+    path.write_text(MANUAL, encoding="utf-8")
+    return path
+
+
+def test_sections_split_at_level_two_headings_only(manual):
+    sections = list(iter_markdown_sections(manual))
+
+    assert "".join(sections) == MANUAL
+    assert [section.splitlines()[0] for section in sections] == ["# Policies Manual", "## Leave", "## Hardware"]
+
+
+def test_empty_file_has_no_sections(tmp_path):
+    path = tmp_path / "empty.md"
+    path.write_bytes(b"")
+
+    assert list(iter_markdown_sections(path)) == []
+
+
+def test_chunks_never_span_a_level_two_heading(manual):
+    chunks = [chunk for section in iter_section_chunks(manual, "manual", MarkdownHeaderChunking()) for chunk in section]
+
+    # The whole manual fits in one 512-token chunk; chunking per section keeps each "## " section apart
+    assert [chunk.content.count("## ") - chunk.content.count("### ") for chunk in chunks] == [0, 1, 1]
+    assert "### Sick leave" in chunks[1].content and "### Approval" in chunks[2].content
+    assert [chunk.id for chunk in chunks] == ["manual_0_1", "manual_1_1", "manual_2_1"]
+    assert {chunk.name for chunk in chunks} == {"manual"}
@@ -0,0 +1,98 @@
+"""
+Batch API ingestion
+Embeds a chunked document through the OpenAI Batch API (half price, no per-minute limits, 24h window)
+and bulk-loads the vectors into PgVector without calling the interactive embeddings endpoint
+"""
+import asyncio
+import io
+from typing import Any, Dict, List, Optional
+
+import orjson
+from openai import AsyncOpenAI
+
+from agno.knowledge.document import Document
+from agno.utils.log import logger
+
+from app.knowledge import RRFPgVector
+
+_TERMINAL_BATCH_STATES = ("completed", "failed", "expired", "cancelled")
+
+
+def _batch_requests(documents: List[Document], model: str, dimensions: Optional[int] = None) -> bytes:
+    """One /v1/embeddings request per chunk, as Batch API JSONL; dimensions is only sent when configured"""
+    body: Dict[str, Any] = {"model": model}
+    if dimensions is not None:
+        # Models without native dimension reduction reject the parameter
+        body["dimensions"] = dimensions
+    lines = (
+        orjson.dumps(
+            {
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/embeddings",
+                "body": {**body, "input": document.content},
+            }
+        )
+        for i, document in enumerate(documents)
+    )
+    return b"\n".join(lines) + b"\n"
+
+
+async def batch_embed(
+    client: AsyncOpenAI,
+    documents: List[Document],
+    model: str,
+    dimensions: Optional[int] = None,
+    poll_interval: float = 30,
+) -> Dict[str, List[float]]:
+    """Submit the chunks as one embeddings batch, wait for it, and return {chunk text: vector}"""
+    batch_file = await client.files.create(
+        file=("embeddings.jsonl", io.BytesIO(_batch_requests(documents, model, dimensions))),
+        purpose="batch",
+    )
+    batch = await client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/embeddings",
+        completion_window="24h",
+    )
+    logger.info(f"Submitted embeddings batch {batch.id} with {len(documents)} chunks")
+
+    while batch.status not in _TERMINAL_BATCH_STATES:
+        await asyncio.sleep(poll_interval)
+        batch = await client.batches.retrieve(batch.id)
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Embeddings batch {batch.id} ended as {batch.status}")
+
+    output = await client.files.content(batch.output_file_id)
+    vectors: Dict[str, List[float]] = {}
+    for line in output.content.splitlines():
+        if not line:
+            continue
+        result = orjson.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") != 200:
+            logger.warning(f"Chunk {result.get('custom_id')} failed in batch {batch.id}: {result.get('error')}")
+            continue
+        document = documents[int(result["custom_id"])]
+        vectors[document.content] = response["body"]["data"][0]["embedding"]
+    return vectors
+
+
+async def ingest_with_batch_api(
+    client: AsyncOpenAI,
+    vector_db: RRFPgVector,
+    documents: List[Document],
+    content_hash: str,
+    model: str,
+    dimensions: Optional[int] = None,
+) -> None:
+    """
+    Embed documents via the Batch API and bulk-load them; chunks missing from the batch output use the live embedder.
+    Once loaded, rows of the same document from any other content_hash are deleted.
+    """
+    vectors = await batch_embed(client, documents, model, dimensions)
+    for document in documents:
+        document.embedding = vectors.get(document.content)
+    await vector_db.async_bulk_upsert(content_hash, documents)
+    if documents:
+        await asyncio.to_thread(vector_db.delete_stale, documents[0].name, content_hash)
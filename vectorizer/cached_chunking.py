@@ -0,0 +1,61 @@
+"""
+Cached chunking
+Persists a chunking strategy's output on disk, keyed by a hash of the document text,
+so re-runs over an unchanged file skip the (LLM-driven) chunking pass
+"""
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import List, Union
+
+from agno.knowledge.chunking.strategy import ChunkingStrategy
+from agno.knowledge.document import Document
+from agno.utils.log import log_debug
+
+
+class CachedChunking(ChunkingStrategy):
+    """Wraps another ChunkingStrategy; chunks are pickled under cache_dir as <sha256>.pkl"""
+
+    def __init__(self, strategy: ChunkingStrategy, cache_dir: Union[str, Path]):
+        self.strategy = strategy
+        self.cache_dir = Path(cache_dir)
+
+    def _strategy_fingerprint(self) -> str:
+        """The strategy's type and settings, e.g. AgenticChunking's model id and chunk_size"""
+        settings = []
+        for name, value in sorted(vars(self.strategy).items()):
+            if value is None or isinstance(value, (str, int, float, bool)):
+                settings.append(f"{name}={value!r}")
+            else:
+                # Models and other collaborators: their type and id, not a repr with client objects and addresses
+                settings.append(f"{name}={type(value).__qualname__}:{getattr(value, 'id', '')}")
+        return f"{type(self.strategy).__module__}.{type(self.strategy).__qualname__}({', '.join(settings)})"
+
+    def _cache_path(self, document: Document) -> Path:
+        digest = hashlib.sha256()
+        # Different strategies (or settings) chunk the same text differently
+        digest.update(self._strategy_fingerprint().encode())
+        digest.update(b"\0")
+        digest.update(document.content.encode())
+        return self.cache_dir / f"{digest.hexdigest()}.pkl"
+
+    def chunk(self, document: Document) -> List[Document]:
+        cache_path = self._cache_path(document)
+        try:
+            with open(cache_path, "rb") as f:
+                chunks = pickle.load(f)
+            log_debug(f"Loaded {len(chunks)} cached chunks for {document.name}")
+            return chunks
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            pass
+
+        chunks = self.strategy.chunk(document)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write then rename so an interrupted run never leaves a truncated cache entry
+        tmp_path = cache_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(chunks, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        return chunks
@@ -0,0 +1,94 @@
+"""
+Streaming ingestion
+Splits a markdown file into "## " sections through mmap and overlaps chunking with embedding + insert,
+so memory stays bounded by a section and the first vectors are written before chunking finishes.
+
+The chunking strategy runs on each level-2 section, not on the whole file: no chunk spans a "## "
+heading. With MarkdownHeaderChunking, which splits at every heading level, that only means packing
+restarts at each "## " heading; deeper headings are split by the strategy as usual. Both ingest modes
+chunk through iter_section_chunks, so they produce the same chunk ids for the same file.
+"""
+import asyncio
+import mmap
+import re
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from agno.knowledge.chunking.strategy import ChunkingStrategy
+from agno.knowledge.document import Document
+
+from app.knowledge import RRFPgVector
+
+_SECTION_RE = re.compile(rb"^##\s", re.MULTILINE)
+
+
+def iter_markdown_sections(path: Path) -> Iterator[str]:
+    """Yield the file's text one level-2 section at a time (the preamble before the first "## " included)"""
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            for match in _SECTION_RE.finditer(mm):
+                if match.start() > start:
+                    yield mm[start : match.start()].decode("utf-8")
+                start = match.start()
+            if start < len(mm):
+                yield mm[start:].decode("utf-8")
+
+
+def iter_section_chunks(path: Path, name: str, chunking_strategy: ChunkingStrategy) -> Iterator[List[Document]]:
+    """Yield the chunks of each section in turn; each section is chunked as a document with id <name>_<section>"""
+    for i, section in enumerate(iter_markdown_sections(path)):
+        yield chunking_strategy.chunk(Document(id=f"{name}_{i}", name=name, content=section))
+
+
+async def stream_ingest(
+    vector_db: RRFPgVector,
+    path: Path,
+    name: str,
+    chunking_strategy: ChunkingStrategy,
+    content_hash: str,
+    batch_size: int = 64,
+    max_pending_sections: int = 4,
+) -> int:
+    """
+    Chunk sections in a worker thread while earlier chunks are embedded and COPY-loaded in batches of batch_size.
+
+    This writes the vector table directly rather than through Knowledge, so it replaces the document
+    itself: once every chunk is loaded, rows of `name` from any other content_hash are deleted. Until
+    then searches keep seeing the previous version; a failed load leaves it in place.
+
+    Returns the number of chunks inserted.
+    """
+    queue: "asyncio.Queue[Optional[List[Document]]]" = asyncio.Queue(maxsize=max_pending_sections)
+
+    async def produce() -> None:
+        sections = iter_section_chunks(path, name, chunking_strategy)
+        try:
+            # Chunking (an LLM call per boundary for agentic chunking) runs off the event loop
+            while (chunks := await asyncio.to_thread(next, sections, None)) is not None:
+                await queue.put(chunks)
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    inserted = 0
+    batch: List[Document] = []
+    try:
+        while (chunks := await queue.get()) is not None:
+            batch.extend(chunks)
+            if len(batch) >= batch_size:
+                await vector_db.async_bulk_upsert(content_hash, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            await vector_db.async_bulk_upsert(content_hash, batch)
+            inserted += len(batch)
+    finally:
+        if not producer.done():
+            producer.cancel()
+    # Surface a chunking failure instead of reporting a partial load as complete
+    await producer
+    await asyncio.to_thread(vector_db.delete_stale, name, content_hash)
+    return inserted
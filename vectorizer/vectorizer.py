@@ -1,16 +1,33 @@
 import os
+import sys
 import asyncio
+import argparse
+import hashlib
 from pathlib import Path
 
+# Run as a script from anywhere: make the app package importable
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
 from agno.knowledge.knowledge import Knowledge
 from agno.knowledge.chunking.agentic import AgenticChunking
-from agno.knowledge.embedder.openai import OpenAIEmbedder
 
-from agno.vectordb.pgvector import PgVector, SearchType
+from agno.vectordb.pgvector import SearchType
+from agno.vectordb.pgvector.index import HNSW
+from agno.utils.log import logger
 
 from agno.knowledge.reader.pdf_reader import PDFReader
 from agno.knowledge.reader.markdown_reader import MarkdownReader
 
+from sqlalchemy import text
+
+from app.clients import VECTOR_HALF_PRECISION, openai_client, async_openai_client, get_db_engine
+from app.embeddings import ConcurrentBatchEmbedder
+from app.knowledge import RRFPgVector
+from vectorizer.batch_ingest import ingest_with_batch_api
+from vectorizer.cached_chunking import CachedChunking
+from vectorizer.markdown_header_chunking import MarkdownHeaderChunking
+from vectorizer.streaming_ingest import iter_section_chunks, stream_ingest
+
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -38,22 +55,85 @@ if not RAG_AGENT_MODEL:
     raise ValueError("RAG_AGENT_MODEL environment variable is required")
 
 from agno.models.lmstudio import LMStudio
+from agno.models.openai import OpenAIChat
 from agno.agent.agent import Agent
-async def main():
-    embedder = OpenAIEmbedder(
+
+
+def ensure_indexes(vector_db: RRFPgVector) -> None:
+    """
+    Create the table plus its HNSW (vector_cosine_ops, matching the cosine distance used at query
+    time) index, and the stored tsvector column with its GIN index, before ingestion; each step
+    is a no-op once it exists
+    """
+    if not vector_db.exists():
+        vector_db.create()
+    vector_db.optimize()
+    with vector_db.db_engine.begin() as conn:
+        conn.execute(
+            text(
+                f'CREATE TABLE IF NOT EXISTS "{vector_db.schema}".ingested_docs '
+                "(hash text PRIMARY KEY, name text NOT NULL, ingested_at timestamptz NOT NULL DEFAULT now())"
+            )
+        )
+
+
+def is_ingested(vector_db: RRFPgVector, content_hash: str) -> bool:
+    with vector_db.db_engine.connect() as conn:
+        row = conn.execute(
+            text(f'SELECT 1 FROM "{vector_db.schema}".ingested_docs WHERE hash = :hash'),
+            {"hash": content_hash},
+        ).first()
+    return row is not None
+
+
+def mark_ingested(vector_db: RRFPgVector, content_hash: str, name: str) -> None:
+    """
+    Record content_hash as the loaded version of document `name`, once its rows are written (the
+    loaders delete the rows of earlier versions). Records of those versions are dropped, so
+    reverting to an old version loads it again.
+    """
+    with vector_db.db_engine.begin() as conn:
+        conn.execute(
+            text(f'DELETE FROM "{vector_db.schema}".ingested_docs WHERE name = :name AND hash <> :hash'),
+            {"hash": content_hash, "name": name},
+        )
+        conn.execute(
+            text(
+                f'INSERT INTO "{vector_db.schema}".ingested_docs (hash, name) VALUES (:hash, :name) '
+                "ON CONFLICT (hash) DO NOTHING"
+            ),
+            {"hash": content_hash, "name": name},
+        )
+
+
+async def main(ingest_mode: str = "online", chunking: str = "headers", force: bool = False):
+    embedder = ConcurrentBatchEmbedder(
         id=EMBEDDING_MODEL,
         api_key=LLM_MODEL_API_KEY,
         base_url=LLM_MODEL_BASE_URL,
-        dimensions=768  # Add this for custom dimensions
+        dimensions=768,  # Add this for custom dimensions
+        # Embedder, chunker and agent share the process-wide keep-alive pools from app.clients
+        openai_client=openai_client,
+        async_client=async_openai_client,
+        # PgVector's insert/upsert embed each document batch with embeddings.create(input=[...]) calls,
+        # up to max_concurrency of them in flight
+        enable_batch=True,
+        batch_size=64,
+        max_concurrency=8,
+    )
+
+    vector_db = RRFPgVector(
+        table_name="organization_policies_processes_vectors",
+        db_engine=get_db_engine(),  # Shared pool; psycopg prepares the repeated search statements
+        search_type=SearchType.hybrid, # SearchType.hybrid combines vector (semantic) and keyword (lexical) search for better results. 
+        vector_index=HNSW(m=16, ef_construction=64),  # ef_search is sized per query by RRFPgVector
+        embedder=embedder,
+        half_precision=VECTOR_HALF_PRECISION,
     )
+    ensure_indexes(vector_db)
 
     knowledge = Knowledge(
-        vector_db=PgVector(
-            table_name="organization_policies_processes_vectors",
-            db_url=POSTGRES_DB_URL,
-            search_type=SearchType.hybrid, # SearchType.hybrid combines vector (semantic) and keyword (lexical) search for better results. 
-            embedder=embedder,
-        ),
+        vector_db=vector_db,
         max_results=2,
     )
 
@@ -74,14 +154,57 @@ async def main():
     project_root = Path(__file__).parent.parent
     markdown_path = project_root / "data" / "markdown" / "organization_policies_processes.md"
     
-    await knowledge.add_content_async(
-        name="Organization Policies & Processes Manual - IXORA",
-        path=markdown_path,
-        reader=MarkdownReader(
-            name="Markdown Reader",
-            chunking_strategy=AgenticChunking(),
-        ),
+    document_name = "Organization Policies & Processes Manual - IXORA"
+    if chunking == "agentic":
+        # Agentic chunking asks the LLM for every boundary; unchanged files reuse the last result
+        chunking_strategy = CachedChunking(
+            AgenticChunking(model=OpenAIChat(id="gpt-4o", client=openai_client, async_client=async_openai_client)),
+            cache_dir=project_root / "data" / ".chunk_cache",
+        )
+    else:
+        # The manual is heading-structured, so splitting at headings needs no LLM calls
+        chunking_strategy = MarkdownHeaderChunking(max_tokens=512)
+    markdown_reader = MarkdownReader(
+        name="Markdown Reader",
+        chunking_strategy=chunking_strategy,
     )
+
+    # Unchanged files were already chunked, embedded and inserted by an earlier run with the same chunking
+    digest = hashlib.sha256(chunking.encode())
+    digest.update(b"\0")
+    digest.update(markdown_path.read_bytes())
+    content_hash = digest.hexdigest()
+
+    if not force and is_ingested(vector_db, content_hash):
+        logger.info(f"{document_name} is already ingested, skipping (use --force to re-ingest)")
+    elif ingest_mode == "batch":
+        # One-shot corpus load through the Batch API: half the embedding cost, no interactive rate limits
+        # Same section-scoped chunks as the online path, so switching modes replaces rows instead of duplicating them
+        sections = await asyncio.to_thread(
+            list, iter_section_chunks(markdown_path, document_name, markdown_reader.chunking_strategy)
+        )
+        documents = [chunk for chunks in sections for chunk in chunks]
+        await ingest_with_batch_api(
+            async_openai_client,
+            vector_db,
+            documents,
+            content_hash=content_hash,
+            model=EMBEDDING_MODEL,
+            # Same rule as the live embedder: only text-embedding-3 models take a dimensions parameter
+            dimensions=embedder.dimensions if EMBEDDING_MODEL.startswith("text-embedding-3") else None,
+        )
+        mark_ingested(vector_db, content_hash, document_name)
+    else:
+        # Sections are chunked while earlier chunks are already being embedded and inserted
+        await stream_ingest(
+            vector_db,
+            markdown_path,
+            name=document_name,
+            chunking_strategy=markdown_reader.chunking_strategy,
+            content_hash=content_hash,
+            batch_size=embedder.batch_size,
+        )
+        mark_ingested(vector_db, content_hash, document_name)
     
 
     agent = Agent(
@@ -89,10 +212,13 @@ async def main():
             id=RAG_AGENT_MODEL,
             base_url=LLM_MODEL_BASE_URL,
             api_key=LLM_MODEL_API_KEY,
+            client=openai_client,
+            async_client=async_openai_client,
         ),
         # tools=[ReasoningTools(add_instructions=True, add_few_shot=True, enable_think=True, enable_analyze=True)],
         knowledge=knowledge,
-        add_knowledge_to_context=True,
+        # Retrieve only when the model calls search_knowledge_base, instead of injecting context every turn
+        add_knowledge_to_context=False,
         search_knowledge=True,
         markdown=True,
     )
@@ -100,4 +226,19 @@ async def main():
     await agent.aprint_response("Summarize the steps for requesting hardware approval.", stream=True, markdown=True)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Load the policy manual into the vector database")
+    parser.add_argument(
+        "--ingest-mode",
+        choices=("online", "batch"),
+        default="online",
+        help="online: interactive embeddings endpoint; batch: OpenAI Batch API (slower, half the cost)",
+    )
+    parser.add_argument(
+        "--chunking",
+        choices=("headers", "agentic"),
+        default="headers",
+        help="headers: split at markdown headings (no LLM calls); agentic: LLM-chosen boundaries",
+    )
+    parser.add_argument("--force", action="store_true", help="re-ingest even if this file version was loaded before")
+    args = parser.parse_args()
+    asyncio.run(main(ingest_mode=args.ingest_mode, chunking=args.chunking, force=args.force))